@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+#Active tile tracking against the full FTCS sweep
+#Sandbox Mode centered dot runs (uniform background, hot square in the middle, the
+#default settings) with several tile sizes, checking the frames are identical to the
+#full sweep and counting the share of tile updates actually done. The random start
+#is the worst case where every tile keeps changing
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, heat_advance_active
+
+
+def sandbox(grid, active, start):
+	heat_sys = heat_system(1000, 100, grid, 1, 1, 1, 1, 1e-6, 1e-6, 1, 5)
+	heat_sys.active = active
+	g = heat_sys.init_grid()
+	if start == 'dot':
+		mi = grid//2 - grid//20
+		ma = grid//2 + grid//20
+		g[mi:ma,mi:ma] = heat_sys.ob_temp
+	else:
+		rng = np.random.default_rng(0)
+		g[1:-1,1:-1] += rng.uniform(0, 1, size=(grid-2, grid-2))*heat_sys.ob_temp
+	return heat_sys, g
+
+
+def run(heat_sys, g):
+	gtot = heat_sys.init_sys()
+	gtot[0] = g
+	start = time.perf_counter()
+	out = heat_sys.run(gtot, g)
+	return time.perf_counter() - start, out
+
+
+#share of tile updates done over the whole run
+def updated_share(heat_sys, g):
+	tiles = (heat_sys.grid - 2 + heat_sys.active - 1) // heat_sys.active
+	flags = np.ones((2, tiles, tiles), dtype=np.bool_)
+	steps = (heat_sys.runtime // heat_sys.rate - 1)*heat_sys.frame_steps()
+	a, b, updated = heat_advance_active(g.copy(), g.copy(), heat_sys.alph, steps, heat_sys.active, flags, False)
+	return updated / (steps*tiles**2)
+
+
+def main():
+	#jit warm up
+	for active in [0, 32]:
+		run(*sandbox(100, active, 'dot'))
+
+	print('%6s %6s %7s %10s %8s %9s %6s' % ('grid', 'start', 'tile', 'time (s)', 'speedup', 'updated', 'equal'))
+	for grid, start in [(500, 'dot'), (1000, 'dot'), (2000, 'dot'), (1000, 'random')]:
+		base, ref = run(*sandbox(grid, 0, start))
+		print('%6d %6s %7s %10.3f %7.2fx %9s %6s' % (grid, start, 'full', base, 1.0, '100%', True))
+		for active in [16, 32, 64, 128]:
+			heat_sys, g = sandbox(grid, active, start)
+			elapsed, out = run(heat_sys, g)
+			share = updated_share(heat_sys, g)
+			print('%6d %6s %7d %10.3f %7.2fx %8.1f%% %6s' % (grid, start, active, elapsed, base/elapsed, 100*share, np.array_equal(ref, out)))
+
+
+if __name__ == '__main__':
+	main()
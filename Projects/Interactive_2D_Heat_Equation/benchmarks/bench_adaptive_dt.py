@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+#Benchmark of stability derived and adaptive time steps
+#A fast (iron in steel-like object) and a slow (brick around glass) material pair are
+#run for 10000 s with frames every 500 s on a 200^2 grid with
+#  FTCS at the old fixed dt = 1 s
+#  FTCS at the largest stable dt from auto_dt()
+#  ADI with the adaptive controller at a few per step error limits
+#The error is the largest difference over all frames from ADI at dt = 0.25 s
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system
+
+
+def make_system(bk_tp, ob_tp, scheme):
+	heat_sys = heat_system(10000, 500, 200, 10, 1, 5, 2, bk_tp, ob_tp, 1, 5)
+	heat_sys.get_shape(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png'))
+	heat_sys.scheme = scheme
+	return heat_sys
+
+
+def timed_run(heat_sys):
+	gtot = heat_sys.init_sys()
+	start = time.perf_counter()
+	gtot = heat_sys.run(gtot)
+	return gtot, time.perf_counter() - start
+
+
+def main():
+	#compile the kernels before timing
+	warm = make_system(2e-5, 5e-6, 'adi')
+	warm.runtime = 1000
+	warm.adaptive = 1e-3
+	timed_run(warm)
+	warm = make_system(2e-5, 5e-6, 'ftcs')
+	warm.runtime = 1000
+	timed_run(warm)
+
+	print('%14s %22s %10s %8s %12s %10s' % ('materials', 'run', 'dt (s)', 'steps', 'error (K)', 'time (s)'))
+	for name, bk_tp, ob_tp in [('iron/steel', 2.3e-5, 1.2e-5), ('brick/glass', 5e-7, 3.4e-7)]:
+		ref = make_system(bk_tp, ob_tp, 'adi')
+		ref.dt = 0.25
+		ref_g, ref_time = timed_run(ref)
+
+		runs = []
+		heat_sys = make_system(bk_tp, ob_tp, 'ftcs')
+		runs.append(('FTCS dt = 1 s', heat_sys))
+		heat_sys = make_system(bk_tp, ob_tp, 'ftcs')
+		heat_sys.auto_dt()
+		runs.append(('FTCS stable dt', heat_sys))
+		for tol in [1e-2, 1e-3, 1e-4]:
+			heat_sys = make_system(bk_tp, ob_tp, 'adi')
+			heat_sys.adaptive = tol
+			runs.append(('ADI adaptive %.0e K' % tol, heat_sys))
+
+		for label, heat_sys in runs:
+			dt = heat_sys.dt
+			gtot, run_time = timed_run(heat_sys)
+			dt_label = 'adaptive' if heat_sys.adaptive > 0 else '%.3g' % dt
+			print('%14s %22s %10s %8d %12.2e %10.3f' % (name, label, dt_label, heat_sys.steps_run, abs(gtot - ref_g).max(), run_time))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+#Benchmark of the branch-free alpha field kernel against the is_ob branching kernel
+#Runs every mask in shapes/ and checks both kernels give identical frames
+
+import os
+import sys
+import glob
+import time
+import numpy as np
+from numba import jit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, heat_jump
+
+
+#double buffered kernel that picks ob_alph or bk_alph per cell
+@jit(nopython=True)
+def heat_jump_branch(gtot, dt , dx , bk_tp, runtime, rate, ob_tp, is_ob):
+	g = gtot[0].copy()
+	ng = g.copy()
+	l = len(g[0])
+	t=0
+	f=0
+	bk_alph = (bk_tp*dt)/dx**2
+	ob_alph = (ob_tp*dt)/dx**2
+	for t in range(1,runtime):
+		for i in range(1 ,l-1):
+			for j in range(1,l-1):
+				if is_ob[j][i]:
+					ng[j][i] = g[j][i] + (ob_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
+				else:
+					ng[j][i] = g[j][i] + (bk_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
+		g, ng = ng, g
+		if t % rate ==0:
+			f+=1
+			gtot[f] = g
+	return gtot
+
+
+def main():
+	here = os.path.dirname(os.path.abspath(__file__))
+	shapes = sorted(glob.glob(os.path.join(here, '..', 'shapes', 'project_*.png')))
+	grid = 500
+	runtime = 200
+
+	#warm up the jit so compile time is not measured
+	small = heat_system(10, 1, 100, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+	gtot = small.init_sys()
+	heat_jump_branch(gtot, small.dt, small.dx, small.bk_tp, small.runtime, small.rate, small.ob_tp, small.is_ob)
+	heat_jump(small.init_sys(), small.alph, small.runtime, small.rate)
+
+	print('grid %d, %d steps' % (grid, runtime-1))
+	#heat_jump stops at the last saved frame
+	steps = (10 - 1)*(runtime//10)
+	print('%-12s %8s %16s %16s %8s %6s' % ('shape', 'object', 'branch steps/s', 'alpha steps/s', 'speedup', 'equal'))
+	for path in shapes:
+		heat_sys = heat_system(runtime, runtime//10, grid, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+		heat_sys.get_shape(path)
+
+		gtot = heat_sys.init_sys()
+		start = time.perf_counter()
+		gtot_branch = heat_jump_branch(gtot, heat_sys.dt, heat_sys.dx, heat_sys.bk_tp, heat_sys.runtime, heat_sys.rate, heat_sys.ob_tp, heat_sys.is_ob)
+		rate_branch = (runtime-1)/(time.perf_counter() - start)
+
+		gtot = heat_sys.init_sys()
+		start = time.perf_counter()
+		gtot_alph = heat_jump(gtot, heat_sys.alph, heat_sys.runtime, heat_sys.rate)
+		rate_alph = steps/(time.perf_counter() - start)
+
+		name = os.path.basename(path)[len('project_'):-len('.png')]
+		frac = heat_sys.is_ob.mean()
+		equal = np.array_equal(gtot_branch, gtot_alph)
+		print('%-12s %7.1f%% %16.1f %16.1f %7.2fx %6s' % (name, 100*frac, rate_branch, rate_alph, rate_alph/rate_branch, equal))
+
+
+if __name__ == '__main__':
+	main()
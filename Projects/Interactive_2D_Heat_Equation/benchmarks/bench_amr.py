@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+#Adaptive mesh refinement (amr_grid) against uniform FTCS grids
+#Gear shape at 5 K in a 1 m square at 1 K. Each case is run for the same physical
+#time and compared with a uniform run at twice the finest resolution, all final
+#grids averaged down to the cells of the coarsest grid. Cells updated per physical
+#second counts every cell update (AMR counts a coarse cell as one), so it is the
+#work each case needs to advance the system one second at its accuracy. Last, the
+#heat of an AMR run (sum of T/alph) is checked step by step against the heat
+#through the constant edges
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, amr_grid
+
+shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+size = 1.0 #m
+
+
+def system(grid, amr=0, tol=0.05):
+	heat_sys = heat_system(1000, 100, grid, 1, 1, 1, 1, 1e-6, 2e-6, 1, 5)
+	heat_sys.dx = size / grid
+	heat_sys.get_shape(shape)
+	heat_sys.auto_dt()
+	heat_sys.amr = amr
+	heat_sys.amr_tol = tol
+	return heat_sys
+
+
+def run(heat_sys):
+	gtot = heat_sys.init_sys()
+	start = time.perf_counter()
+	out = heat_sys.run(gtot)
+	elapsed = time.perf_counter() - start
+	cells = heat_sys.cells_run if heat_sys.amr > 0 else heat_sys.steps_run*(heat_sys.grid - 2)**2
+	return elapsed, cells / (heat_sys.steps_run*heat_sys.dt), np.array(out[-1])
+
+
+#Mean of each n x n block of cells
+def coarsen(g, n):
+	l = len(g) // n
+	return g.reshape(l, n, l, n).mean(axis=(1, 3))
+
+
+#Largest relative error of the AMR heat balance over steps single steps
+def conservation(grid, block, tol, steps):
+	heat_sys = system(grid)
+	g = heat_sys.init_grid()
+	mesh = amr_grid(g, heat_sys.alph, heat_sys.is_ob, block, tol)
+	err = 0.0
+	for s in range(steps):
+		t = mesh.tf
+		edges = (t[0,1:-1] - t[1,1:-1]).sum() + (t[-1,1:-1] - t[-2,1:-1]).sum() + (t[1:-1,0] - t[1:-1,1]).sum() + (t[1:-1,-1] - t[1:-1,-2]).sum()
+		before = mesh.heat()
+		mesh.advance(1)
+		err = max(err, abs(mesh.heat() - before - edges) / before)
+	return err
+
+
+def main():
+	grid = 400
+	#jit warm up
+	run(system(100))
+	run(system(100, 10))
+
+	elapsed, rate, ref = run(system(2*grid))
+	ref = coarsen(ref, 4)
+	print('reference: uniform %d^2, %.1f s' % (2*grid, elapsed))
+	print('%-22s %12s %10s %14s %12s %12s' % ('case', 'cells vs N^2', 'time (s)', 'cells/phys s', 'max err (K)', 'mean err (K)'))
+	cases = [('uniform %d^2' % (grid//2), system(grid//2)), ('uniform %d^2' % grid, system(grid))]
+	for block, tol in [(10, 0.05), (20, 0.05), (10, 0.2), (20, 0.2), (40, 0.05)]:
+		cases.append(('AMR block %d tol %g' % (block, tol), system(grid, block, tol)))
+	for name, heat_sys in cases:
+		elapsed, rate, out = run(heat_sys)
+		err = abs(coarsen(out, heat_sys.grid // (grid//2)) - ref)
+		share = heat_sys.cells_run / (heat_sys.steps_run*(heat_sys.grid - 2)**2) if heat_sys.amr > 0 else 1.0
+		print('%-22s %11.1f%% %10.3f %14.3g %12.2e %12.2e' % (name, 100*share, elapsed, rate, err.max(), err.mean()))
+
+	print('AMR heat balance, largest relative error over 60 steps: %.1e' % conservation(grid, 10, 0.05, 60))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+#Scenarios per second of the batched kernel against a loop of heat_step calls
+#B independent 100^2 scenarios with different diffusivities and temperatures are
+#advanced the same number of steps, once as a stack from batch_stack with
+#heat_advance_batch and once one grid at a time with heat_step, and the results
+#are checked to be identical
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, heat_step, heat_advance_batch, batch_stack, batch_width, batch_grid
+
+
+def make_systems(count, grid, shape):
+	systems = []
+	for b in range(count):
+		heat_sys = heat_system(100, 10, grid, 1, 1, 1, 1, 1e-6*(1 + b % 4), 2e-6, 1, 2 + b % 5)
+		heat_sys.get_shape(shape)
+		systems.append(heat_sys)
+	return systems
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+	grid = 100
+	steps = 20
+	width = batch_width(grid)
+
+	#jit warm up
+	systems = make_systems(2, grid, shape)
+	g, alph = batch_stack(systems)
+	heat_advance_batch(g, g.copy(), alph, 1)
+	heat_step(systems[0].init_grid(), systems[0].alph)
+
+	print('grid %d, %d steps per scenario, blocks of up to %d scenarios' % (grid, steps, width))
+	print('%6s %14s %14s %10s %14s %6s' % ('B', 'loop (scen/s)', 'batch (scen/s)', 'speedup', 'batch (ns/cell)', 'equal'))
+	count = 1
+	while count <= 1024:
+		systems = make_systems(count, grid, shape)
+		g, alph = batch_stack(systems)
+
+		start = time.perf_counter()
+		ref = []
+		for b, heat_sys in enumerate(systems):
+			s = np.ascontiguousarray(batch_grid(g, b))
+			for t in range(steps):
+				s = heat_step(s, heat_sys.alph)
+			ref.append(s)
+		loop = time.perf_counter() - start
+
+		start = time.perf_counter()
+		out, spare = heat_advance_batch(g, g.copy(), alph, steps)
+		batch = time.perf_counter() - start
+
+		equal = all(np.array_equal(batch_grid(out, b), ref[b]) for b in range(count))
+		print('%6d %14.0f %14.0f %9.2fx %14.2f %6s' % (count, count/loop*steps, count/batch*steps, loop/batch, 1e9*batch/(count*steps*grid**2), equal))
+		count *= 2
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+#Benchmark of the per frame statistics computed inside heat_jump
+#against the old second pass, g[is_ob].mean() over every stored frame
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, heat_jump, stat_names
+
+
+def main():
+	print('%6s %7s %14s %14s %14s %10s' % ('grid', 'frames', 'no stats (s)', 'fused (s)', 'two pass (s)', 'max diff'))
+	for grid, frames in [(200, 1000), (500, 200), (1000, 50)]:
+		heat_sys = heat_system(frames*10, 10, grid, 10, 1, 5, 2, 2e-5, 5e-6, 1, 5)
+		heat_sys.get_shape(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png'))
+		gtot = heat_sys.init_sys()
+		stats = np.zeros((frames, len(stat_names)))
+		heat_jump(gtot[:3].copy(), heat_sys.alph, 30, 10)
+		heat_jump(gtot[:3].copy(), heat_sys.alph, 30, 10, 0, 0.0, stats[:3], heat_sys.ob_spans, heat_sys.bk_spans)
+
+		start = time.perf_counter()
+		heat_jump(gtot, heat_sys.alph, heat_sys.runtime, heat_sys.rate)
+		plain = time.perf_counter() - start
+		start = time.perf_counter()
+		heat_jump(gtot, heat_sys.alph, heat_sys.runtime, heat_sys.rate, 0, 0.0, stats, heat_sys.ob_spans, heat_sys.bk_spans)
+		fused = time.perf_counter() - start
+		start = time.perf_counter()
+		ob_mean = np.array([g[heat_sys.is_ob].mean() for g in gtot])
+		two_pass = time.perf_counter() - start
+		print('%6d %7d %14.3f %14.3f %14.3f %10.1e' % (grid, frames, plain, fused, two_pass, abs(ob_mean - stats[:,0]).max()))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+#Benchmark of the implicit schemes against FTCS at matched accuracy
+#A background of iron (2.3e-5 m^2/s, right at the FTCS limit with dt = 1 s) and one of
+#copper (1.1e-4 m^2/s, FTCS needs dt = 0.2 s) holding a slower object are run for 2000 s
+#with frames every 100 s. The reference is FTCS at a quarter of its stable dt and the
+#error is the largest difference over all saved frames. For every implicit scheme the
+#largest dt whose error is no worse than FTCS at its stable dt is picked and its wall
+#time compared to FTCS. 'be' and 'cn' (multigrid solves) are only run on the small grid.
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system
+
+
+def make_system(grid, bk_tp, scheme, dt):
+	heat_sys = heat_system(2000, 100, grid, 10, 1, 5, 2, bk_tp, 5e-6, 1, 5)
+	heat_sys.get_shape(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png'))
+	heat_sys.scheme = scheme
+	heat_sys.dt = dt
+	return heat_sys
+
+
+def timed_run(grid, bk_tp, scheme, dt):
+	heat_sys = make_system(grid, bk_tp, scheme, dt)
+	gtot = heat_sys.init_sys()
+	start = time.perf_counter()
+	gtot = heat_sys.run(gtot)
+	return gtot, time.perf_counter() - start
+
+
+def main():
+	#compile every kernel before timing
+	for scheme in ['ftcs', 'be', 'cn', 'adi']:
+		timed_run(100, 2e-5, scheme, 1)
+
+	for name, bk_tp, ftcs_dt in [('iron', 2.3e-5, 1), ('copper', 1.1e-4, 0.2)]:
+		for grid in [200, 500]:
+			ref, ref_time = timed_run(grid, bk_tp, 'ftcs', ftcs_dt/4)
+			gtot, ftcs_time = timed_run(grid, bk_tp, 'ftcs', ftcs_dt)
+			ftcs_err = abs(gtot - ref).max()
+			print('%s %d^2: FTCS dt = %g s, max error %.2e K, %.3f s' % (name, grid, ftcs_dt, ftcs_err, ftcs_time))
+			print('%8s %8s %12s %10s %10s' % ('scheme', 'dt (s)', 'error (K)', 'time (s)', 'vs FTCS'))
+			for scheme in ['be', 'cn', 'adi']:
+				if scheme != 'adi' and grid > 200:
+					continue
+				best = None
+				for dt in [0.2, 0.25, 0.5, 1, 2, 4, 5, 10, 20, 25, 50, 100]:
+					if dt < ftcs_dt or (scheme != 'adi' and dt < 1):
+						continue
+					gtot, run_time = timed_run(grid, bk_tp, scheme, dt)
+					err = abs(gtot - ref).max()
+					print('%8s %8g %12.2e %10.3f %9.1fx' % (scheme, dt, err, run_time, ftcs_time/run_time))
+					if err > ftcs_err:
+						break
+					best = (dt, run_time)
+				if best is None:
+					print('%8s does not reach the FTCS error' % scheme)
+				else:
+					print('%8s matched at dt = %g s: %.3f s, %.1fx FTCS' % (scheme, best[0], best[1], ftcs_time/best[1]))
+			print()
+
+
+if __name__ == '__main__':
+	main()
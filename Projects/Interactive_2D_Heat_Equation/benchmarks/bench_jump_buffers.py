@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+#Benchmark of the double-buffered heat_jump against the original copy-per-step kernel
+#Prints steps/second for each grid size and checks both kernels give identical frames
+
+import os
+import sys
+import time
+import numpy as np
+from numba import jit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, heat_jump
+
+
+#original kernel (v1.3), allocates and copies two full grids every step
+@jit(nopython=True)
+def heat_jump_copy(gtot, dt , dx , bk_tp, runtime, rate, ob_tp, is_ob):
+	g = gtot[0].copy()
+	l = len(g[0])
+	t=0
+	f=0
+	bk_alph = (bk_tp*dt)/dx**2
+	ob_alph = (ob_tp*dt)/dx**2
+	for t in range(1,runtime):
+		ng = g.copy()
+		for i in range(1 ,l-1):
+			for j in range(1,l-1):
+				if is_ob[j][i]:
+					ng[j][i] = g[j][i] + (ob_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
+				else:
+					ng[j][i] = g[j][i] + (bk_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
+		g = ng.copy()
+		if t % rate ==0:
+			f+=1
+			gtot[f] = g
+	return gtot
+
+
+#Time one kernel, returns (steps/s, gtot)
+def time_kernel(kernel, heat_sys):
+	gtot = heat_sys.init_sys()
+	start = time.perf_counter()
+	if kernel is heat_jump:
+		gtot = kernel(gtot, heat_sys.alph, heat_sys.runtime, heat_sys.rate)
+		#heat_jump stops at the last saved frame
+		steps = (heat_sys.runtime//heat_sys.rate - 1)*heat_sys.rate
+	else:
+		gtot = kernel(gtot, heat_sys.dt, heat_sys.dx, heat_sys.bk_tp, heat_sys.runtime, heat_sys.rate, heat_sys.ob_tp, heat_sys.is_ob)
+		steps = heat_sys.runtime-1
+	elapsed = time.perf_counter() - start
+	return steps/elapsed, gtot
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_circle.png')
+	#(grid, runtime) pairs, runtime is cut down on big grids to keep the benchmark short
+	cases = [(100, 2000), (500, 200), (1000, 50)]
+
+	print('%6s %14s %14s %8s %6s' % ('grid', 'copy steps/s', 'swap steps/s', 'speedup', 'equal'))
+	for grid, runtime in cases:
+		heat_sys = heat_system(runtime, runtime//10, grid, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+		heat_sys.get_shape(shape)
+
+		#warm up the jit on a tiny run so compile time is not measured
+		small = heat_system(10, 1, 100, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+		time_kernel(heat_jump_copy, small)
+		time_kernel(heat_jump, small)
+
+		rate_copy, gtot_copy = time_kernel(heat_jump_copy, heat_sys)
+		rate_swap, gtot_swap = time_kernel(heat_jump, heat_sys)
+		equal = np.array_equal(gtot_copy, gtot_swap)
+		print('%6d %14.1f %14.1f %7.2fx %6s' % (grid, rate_copy, rate_swap, rate_swap/rate_copy, equal))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+#Benchmark of loop order and cache blocking in heat_jump
+#Compares the old column by column kernel to row streaming and column strip (tiled) sweeps
+#on grids larger than L2 (1000^2 float64 is already 8 MB per buffer)
+
+import os
+import sys
+import time
+import numpy as np
+from numba import jit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, heat_jump
+
+
+#alpha field kernel with i (columns) outside and j (rows) inside
+@jit(nopython=True)
+def heat_jump_cols(gtot, alph, runtime, rate):
+	g = gtot[0].copy()
+	ng = g.copy()
+	l = len(g[0])
+	t=0
+	f=0
+	for t in range(1,runtime):
+		for i in range(1 ,l-1):
+			for j in range(1,l-1):
+				ng[j][i] = g[j][i] + (alph[j][i])*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
+		g, ng = ng, g
+		if t % rate ==0:
+			f+=1
+			gtot[f] = g
+	return gtot
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+	cases = [(500, 200), (1000, 50), (2000, 20), (3000, 10)]
+	tiles = [0, 256, 1024]
+
+	#warm up the jit so compile time is not measured
+	small = heat_system(10, 1, 100, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+	heat_jump_cols(small.init_sys(), small.alph, small.runtime, small.rate)
+	for tile in tiles:
+		heat_jump(small.init_sys(), small.alph, small.runtime, small.rate, tile)
+
+	head = '%6s %8s %12s' % ('grid', 'MB/grid', 'cols st/s')
+	for tile in tiles:
+		head += ' %12s' % ('rows st/s' if tile == 0 else 'tile%d st/s' % tile)
+	print(head + ' %6s' % 'equal')
+
+	for grid, runtime in cases:
+		heat_sys = heat_system(runtime, runtime//10, grid, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+		heat_sys.get_shape(shape)
+
+		gtot = heat_sys.init_sys()
+		start = time.perf_counter()
+		ref = heat_jump_cols(gtot, heat_sys.alph, heat_sys.runtime, heat_sys.rate)
+		line = '%6d %8.1f %12.1f' % (grid, 8*grid**2/1e6, (runtime-1)/(time.perf_counter() - start))
+
+		#heat_jump stops at the last saved frame, 9 of the 10 frames are computed
+		equal = True
+		for tile in tiles:
+			gtot = heat_sys.init_sys()
+			start = time.perf_counter()
+			gtot = heat_jump(gtot, heat_sys.alph, heat_sys.runtime, heat_sys.rate, tile)
+			line += ' %12.1f' % ((9*(runtime//10))/(time.perf_counter() - start))
+			equal = equal and np.array_equal(ref, gtot)
+		print(line + ' %6s' % equal)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+#Time to get a shape mask with load_mask() against the old get_shape()
+#(float mean of the channels and two np.repeat copies every call), for a first
+#load, a load from the packed bit disk cache and a repeated load from memory
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import heat_project
+from heat_project import load_mask
+
+
+def old_mask(path, grid):
+	im = np.mean(np.array(Image.open(path)), axis=2)
+	is_ob = im < 100
+	scale = grid // len(is_ob)
+	return np.repeat(np.repeat(is_ob, scale, axis=0), scale, axis=1)
+
+
+def best(fn, repeat=5):
+	times = []
+	for r in range(repeat):
+		start = time.perf_counter()
+		out = fn()
+		times.append(time.perf_counter() - start)
+	return min(times), out
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+	print('%6s %10s %12s %12s %12s %12s %6s' % ('grid', 'old (ms)', 'first (ms)', 'disk (ms)', 'memory (us)', 'disk bytes', 'equal'))
+	for grid in [100, 500, 1000, 2000, 4000]:
+		with tempfile.TemporaryDirectory() as cache_dir:
+			old, ref = best(lambda: old_mask(shape, grid))
+
+			def first():
+				heat_project.mask_cache.clear()
+				heat_project.shape_cache.clear()
+				return load_mask(shape, grid)
+			new, mask = best(first)
+
+			load_mask(shape, grid, cache_dir)
+			def disk():
+				heat_project.mask_cache.clear()
+				return load_mask(shape, grid, cache_dir)
+			from_disk, cached = best(disk)
+
+			memory, again = best(lambda: load_mask(shape, grid), 100)
+			size = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir))
+			equal = np.array_equal(ref, mask) and np.array_equal(ref, cached) and again is cached
+			print('%6d %10.3f %12.3f %12.3f %12.1f %12d %6s' % (grid, 1e3*old, 1e3*new, 1e3*from_disk, 1e6*memory, size, equal))
+
+
+if __name__ == '__main__':
+	main()
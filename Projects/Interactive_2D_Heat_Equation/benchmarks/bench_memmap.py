@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+#Benchmark of peak memory and wall time for keeping the full frame history
+#Each mode runs in its own process so its peak RSS can be measured:
+#  memory  gtot from init_sys() in RAM
+#  memmap  gtot from init_sys(path), an .npy file the kernel writes into
+#  stream  frames streamed to an .npy file with run_stream() and frame_writer
+#The memory mode is skipped when the history does not fit in the available RAM
+#The memmap RSS includes file pages the kernel has touched, the OS writes them
+#back and drops them under memory pressure so they can not run the machine out of RAM
+#
+#usage: bench_memmap.py [grid] [frames]    (default 1000 1000)
+
+import os
+import sys
+import time
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+#Run one mode and print the wall time, called in a child process
+def child(mode, grid, frames, path):
+	from heat_project import heat_system, frame_writer
+	heat_sys = heat_system(frames, 1, grid, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+	heat_sys.get_shape(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png'))
+
+	#compile the kernels on a tiny system first
+	small = heat_system(4, 1, 100, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+	small.run(small.init_sys())
+	small.run_stream(small.init_grid(), lambda f, g: None)
+
+	start = time.perf_counter()
+	if mode == 'memory':
+		gtot = heat_sys.run(heat_sys.init_sys())
+	elif mode == 'memmap':
+		gtot = heat_sys.run(heat_sys.init_sys(path))
+		gtot.flush()
+	else:
+		sink = frame_writer(path, frames, grid)
+		heat_sys.run_stream(heat_sys.init_grid(), sink)
+		sink.close()
+	print(time.perf_counter() - start)
+
+
+def main():
+	grid = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	frames = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+	nbytes = 8*frames*grid**2
+	avail = os.sysconf('SC_AVPHYS_PAGES')*os.sysconf('SC_PAGE_SIZE')
+
+	print('grid %d, %d frames, history %.2f GB, available RAM %.2f GB' % (grid, frames, nbytes/1e9, avail/1e9))
+	print('%8s %10s %14s' % ('mode', 'time (s)', 'peak RSS (MB)'))
+	for mode in ['memory', 'memmap', 'stream']:
+		if mode == 'memory' and nbytes > 0.8*avail:
+			print('%8s %10s %14s' % (mode, '-', 'does not fit'))
+			continue
+		path = os.path.join(tempfile.gettempdir(), 'bench_memmap_%d.npy' % os.getpid())
+		proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', mode, str(grid), str(frames), path], stdout=subprocess.PIPE)
+		out = proc.stdout.read()
+		pid, status, usage = os.wait4(proc.pid, 0)
+		if os.path.exists(path):
+			os.remove(path)
+		#ru_maxrss is in kB on linux
+		print('%8s %10.2f %14.1f' % (mode, float(out), usage.ru_maxrss/1024))
+
+
+if __name__ == '__main__':
+	if len(sys.argv) > 1 and sys.argv[1] == '--child':
+		child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5])
+	else:
+		main()
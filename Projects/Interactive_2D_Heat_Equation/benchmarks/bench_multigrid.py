@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+#Benchmark of the multigrid solver at growing grid sizes
+#For the steady state (s = 0) and a backward Euler step with dt = 1000 s (s = 1/alph,
+#which carries the is_ob jump) V and W cycles are run to a 1e-10 relative residual.
+#The cycle counts should stay flat and the time per interior cell roughly constant.
+#The sparse LU steady state is timed next to it up to 1000^2.
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, multigrid
+
+
+def make_system(grid):
+	heat_sys = heat_system(200, 100, grid, 10, 1, 5, 2, 2e-5, 5e-6, 1, 5)
+	heat_sys.get_shape(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png'))
+	return heat_sys
+
+
+def edge_rhs(g):
+	rhs = np.zeros((g.shape[0] - 2, g.shape[1] - 2))
+	rhs[0,:] += g[0,1:-1]
+	rhs[-1,:] += g[-1,1:-1]
+	rhs[:,0] += g[1:-1,0]
+	rhs[:,-1] += g[1:-1,-1]
+	return rhs
+
+
+def main():
+	multigrid(20).solve(np.ones(400))
+	print('%6s %8s %6s %10s %10s %7s %12s %10s' % ('grid', 'problem', 'cycle', 'setup (s)', 'solve (s)', 'cycles', 'us per cell', 'lu (s)'))
+	for grid in [100, 500, 1000, 2000]:
+		heat_sys = make_system(grid)
+		g = heat_sys.init_grid()
+		m = grid - 2
+		lu_time = float('nan')
+		if grid <= 1000:
+			start = time.perf_counter()
+			heat_sys.steady_state(method='lu')
+			lu_time = time.perf_counter() - start
+
+		#steady state, then one backward Euler step from the starting grid
+		dt = 1000.0
+		s = heat_sys.dx**2/(dt*np.where(heat_sys.is_ob, heat_sys.ob_tp, heat_sys.bk_tp))[1:-1,1:-1]
+		problems = [('steady', None, edge_rhs(g)), ('implicit', s, edge_rhs(g) + s*g[1:-1,1:-1])]
+		for name, coef, rhs in problems:
+			for cycle in ['V', 'W']:
+				start = time.perf_counter()
+				mg = multigrid(m, coef, cycle)
+				setup = time.perf_counter() - start
+				start = time.perf_counter()
+				mg.solve(rhs, tol=1e-10)
+				solve = time.perf_counter() - start
+				print('%6d %8s %6s %10.3f %10.3f %7d %12.3f %10.3f' % (grid, name, cycle, setup, solve, mg.cycles, 1e6*(setup + solve)/m**2, lu_time))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+#Benchmark of object statistics from row spans against boolean mask gathers
+#For each shape the object mean, min and max of one frame are taken with
+#g[is_ob] and with span_stats() over heat_system.ob_spans
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, span_stats
+
+
+def best_time(fn, repeat=20):
+	best = float('inf')
+	for r in range(repeat):
+		start = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main():
+	shapes = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes')
+	print('%20s %6s %10s %7s %12s %12s %8s' % ('shape', 'grid', 'ob cells', 'spans', 'mask (ms)', 'spans (ms)', 'speedup'))
+	for shape in ['project_stickfig.png', 'project_hello.png', 'project_gear.png']:
+		for grid in [1000, 2000]:
+			heat_sys = heat_system(20, 10, grid, 10, 1, 5, 2, 2e-5, 5e-6, 1, 5)
+			heat_sys.get_shape(os.path.join(shapes, shape))
+			g = heat_sys.init_grid() + np.random.rand(grid, grid)
+			spans = heat_sys.ob_spans
+			span_stats(g, spans)
+
+			def mask():
+				vals = g[heat_sys.is_ob]
+				return vals.mean(), vals.min(), vals.max()
+
+			def span():
+				n, total, lo, hi = span_stats(g, spans)
+				return total/n, lo, hi
+
+			assert np.allclose(mask(), span())
+			mask_time = best_time(mask)
+			span_time = best_time(span)
+			print('%20s %6d %10d %7d %12.3f %12.3f %7.1fx' % (shape, grid, np.count_nonzero(heat_sys.is_ob), len(spans), 1e3*mask_time, 1e3*span_time, mask_time/span_time))
+
+
+if __name__ == '__main__':
+	main()
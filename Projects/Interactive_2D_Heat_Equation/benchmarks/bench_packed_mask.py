@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+#Memory and time of the bit packed object mask (packed_mask) against the bool array
+#For each grid: bytes held per mask, count, bounding box and row spans on either
+#form, building a system from it (init_grid with alph and spans), and the FTCS
+#steps of the run, which only read alph so they should not change at all
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, load_mask, mask_spans, packed_mask, heat_advance
+
+
+def best(fn, repeat=5):
+	times = []
+	for r in range(repeat):
+		start = time.perf_counter()
+		out = fn()
+		times.append(time.perf_counter() - start)
+	return min(times), out
+
+
+def bool_bbox(m):
+	rows = np.flatnonzero(m.any(axis=1))
+	cols = np.flatnonzero(m.any(axis=0))
+	return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+	steps = 20
+
+	#jit warm up
+	small = packed_mask(load_mask(shape, 100))
+	small.spans()
+	heat_sys = heat_system(10, 1, 100, 1, 1, 1, 1, 1e-6, 2e-6, 1, 5)
+	heat_sys.is_ob = small
+	g = heat_sys.init_grid()
+	heat_advance(g, g.copy(), heat_sys.alph, 1, 0)
+
+	print('times in ms, %d FTCS steps per run' % steps)
+	print('%6s %6s %10s %8s %8s %8s %8s %10s %6s' % ('grid', 'form', 'bytes', 'count', 'bbox', 'spans', 'system', 'steps', 'equal'))
+	for grid in [1000, 2000, 4000]:
+		mask = np.array(load_mask(shape, grid))
+		packed = packed_mask(mask)
+		ref = None
+		for form, m in [('bool', mask), ('packed', packed)]:
+			if form == 'bool':
+				count, n = best(lambda: int(m.sum()))
+				bbox, box = best(lambda: bool_bbox(m))
+			else:
+				count, n = best(m.count)
+				bbox, box = best(m.bbox)
+			spans, sp = best(lambda: mask_spans(m))
+
+			heat_sys = heat_system(10, 1, grid, 1, 1, 1, 1, 1e-6, 2e-6, 1, 5)
+			heat_sys.is_ob = m
+			system, g = best(heat_sys.init_grid)
+			run, out = best(lambda: heat_advance(g.copy(), g.copy(), heat_sys.alph, steps, 0)[0], 3)
+			if ref is None:
+				ref = (n, box, sp, out)
+			equal = n == ref[0] and box == ref[1] and np.array_equal(sp, ref[2]) and np.array_equal(out, ref[3])
+			print('%6d %6s %10d %8.3f %8.3f %8.3f %8.2f %10.1f %6s' % (grid, form, m.nbytes, 1e3*count, 1e3*bbox, 1e3*spans, 1e3*system, 1e3*run, equal))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+#Strong scaling benchmark of the parallel heat solver
+#Runs the same 1000^2 system on 1 to N threads and checks every run
+#matches the serial kernel exactly
+
+import os
+import sys
+import time
+import numpy as np
+from numba import config, set_num_threads
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, heat_jump_par
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+	grid = 1000
+	runtime = 100
+	max_threads = config.NUMBA_NUM_THREADS
+
+	heat_sys = heat_system(runtime, runtime//10, grid, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+	heat_sys.get_shape(shape)
+
+	#serial reference, first call is the jit warm up
+	heat_sys.threads = 1
+	heat_sys.run(heat_sys.init_sys())
+	start = time.perf_counter()
+	ref = heat_sys.run(heat_sys.init_sys())
+	serial = time.perf_counter() - start
+
+	steps = 9*(runtime//10)
+	print('grid %d, %d steps, serial %.3f s' % (grid, steps, serial))
+	print('%8s %10s %10s %8s %10s %6s' % ('threads', 'time (s)', 'steps/s', 'speedup', 'efficiency', 'equal'))
+
+	#warm up the parallel kernel
+	heat_jump_par(heat_sys.init_sys(), heat_sys.alph, heat_sys.runtime, heat_sys.rate)
+
+	threads = 1
+	while True:
+		set_num_threads(threads)
+		start = time.perf_counter()
+		gtot = heat_jump_par(heat_sys.init_sys(), heat_sys.alph, heat_sys.runtime, heat_sys.rate)
+		elapsed = time.perf_counter() - start
+		speed = serial/elapsed
+		print('%8d %10.3f %10.1f %7.2fx %9.0f%% %6s' % (threads, elapsed, steps/elapsed, speed, 100*speed/threads, np.array_equal(ref, gtot)))
+		if threads == max_threads:
+			break
+		threads = min(2*threads, max_threads)
+
+
+if __name__ == '__main__':
+	main()
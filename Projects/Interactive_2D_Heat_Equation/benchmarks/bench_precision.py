@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+#Benchmark of the precision modes: compute dtype and frame storage dtype
+#Each mode runs the same 1000^2 system, the error is the largest difference over all
+#frames from the float64 run, memory is the size of the stored frames
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system
+
+
+def make_system(dtype, store):
+	heat_sys = heat_system(2000, 50, 1000, 10, 1, 5, 2, 2e-5, 5e-6, 1, 5)
+	heat_sys.get_shape(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png'))
+	heat_sys.dtype = dtype
+	heat_sys.store = store
+	return heat_sys
+
+
+def timed_run(dtype, store):
+	heat_sys = make_system(dtype, store)
+	gtot = heat_sys.init_sys()
+	g = heat_sys.init_grid()
+	start = time.perf_counter()
+	frames = heat_sys.run(gtot, g)
+	run_time = time.perf_counter() - start
+	return heat_sys, gtot, frames, run_time
+
+
+def main():
+	modes = [('float64', None), ('float32', None), ('float64', 'float32'), ('float64', 'float16'), ('float64', 'uint16'), ('float32', 'uint16')]
+	#compile the kernels for both dtypes
+	for dtype in ['float64', 'float32']:
+		heat_sys = make_system(dtype, None)
+		heat_sys.runtime = 100
+		heat_sys.run(heat_sys.init_sys())
+
+	ref = None
+	print('%8s %8s %12s %12s %14s %12s' % ('compute', 'store', 'frames (MB)', 'time (s)', 'Mcell-steps/s', 'max err (K)'))
+	for dtype, store in modes:
+		heat_sys, gtot, frames, run_time = timed_run(dtype, store)
+		decoded = np.array([frames[i] for i in range(len(frames))], dtype=np.float64)
+		if ref is None:
+			ref = decoded
+		steps = heat_sys.steps_run*(heat_sys.grid - 2)**2
+		print('%8s %8s %12.1f %12.3f %14.1f %12.2e' % (dtype, store or '-', gtot.nbytes/1e6, run_time, steps/run_time/1e6, abs(decoded - ref).max()))
+		del gtot, frames, decoded
+
+
+if __name__ == '__main__':
+	main()
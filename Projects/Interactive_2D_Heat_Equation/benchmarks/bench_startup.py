@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+#Startup time from process start to the first computed FTCS step
+#Each case starts a fresh interpreter that imports heat_project, sets up a 100^2
+#system and takes one heat_step, once with an empty kernel cache (compiles the
+#kernels like every launch did before cache=True) and then with the cache filled
+#by the first run. Also times the plotting imports that are now only done when a
+#plot is shown
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+here = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+first_step = '''
+import time
+start = time.perf_counter()
+import heat_project
+imported = time.perf_counter()
+heat_sys = heat_project.heat_system(2, 1, 100, 1, 1, 1, 1, 1e-6, 2e-6, 1, 5)
+g = heat_project.heat_step(heat_sys.init_grid(), heat_sys.alph)
+print(imported - start, time.perf_counter() - imported)
+'''
+
+plot_imports = '''
+import time
+start = time.perf_counter()
+import matplotlib.pyplot
+import matplotlib.animation
+from PIL import Image
+print(time.perf_counter() - start)
+'''
+
+
+def launch(code, cache_dir):
+	env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir, PYTHONPATH=here)
+	start = time.perf_counter()
+	out = subprocess.run([sys.executable, '-c', code], env=env, cwd=here, capture_output=True, text=True, check=True)
+	return time.perf_counter() - start, [float(x) for x in out.stdout.split()]
+
+
+def main():
+	with tempfile.TemporaryDirectory() as cache_dir:
+		print('%-14s %12s %12s %14s' % ('case', 'import (s)', 'step (s)', 'to step (s)'))
+		for case in ['empty cache', 'cached', 'cached']:
+			total, (imported, step) = launch(first_step, cache_dir)
+			print('%-14s %12.3f %12.3f %14.3f' % (case, imported, step, total))
+		total, (plots,) = launch(plot_imports, cache_dir)
+		print('matplotlib and PIL imports, skipped unless plotting: %.3f s' % plots)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+#Benchmark of the direct steady state solver against time stepping to equilibrium
+#Small grids are run with heat_jump until the largest change per step is below
+#1e-12 and compared to heat_system.steady_state(). On large grids time stepping
+#takes far too long, so its time is estimated from the measured step rate and the
+#steps the small grids needed, which grow with the grid size squared.
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system
+
+
+def make_system(grid, runtime, rate):
+	heat_sys = heat_system(runtime, rate, grid, 10, 1, 5, 2, 2e-5, 5e-6, 1, 5)
+	heat_sys.get_shape(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png'))
+	return heat_sys
+
+
+def main():
+	print('%6s %12s %12s %12s %12s %10s' % ('grid', 'ftcs steps', 'ftcs (s)', 'lu (s)', 'cg (s)', 'max diff'))
+
+	#time stepping to equilibrium, steps per grid cell length squared
+	per_cell2 = []
+	for grid in [100, 200]:
+		heat_sys = make_system(grid, 40*grid**2, 100)
+		heat_sys.tol = 1e-12
+		small = make_system(100, 200, 100)
+		small.tol = 1e-12
+		small.run(small.init_sys())
+		start = time.perf_counter()
+		gtot = heat_sys.run(heat_sys.init_sys())
+		ftcs = time.perf_counter() - start
+		steps = (heat_sys.frames_run - 1)*heat_sys.rate
+		per_cell2.append(steps/grid**2)
+
+		start = time.perf_counter()
+		lu = heat_sys.steady_state(method='lu')
+		lu_time = time.perf_counter() - start
+		start = time.perf_counter()
+		heat_sys.steady_state(method='cg')
+		cg_time = time.perf_counter() - start
+		print('%6d %12d %12.2f %12.3f %12.3f %10.1e' % (grid, steps, ftcs, lu_time, cg_time, abs(lu - gtot[-1]).max()))
+
+	for grid in [500, 1000]:
+		heat_sys = make_system(grid, 20, 10)
+		start = time.perf_counter()
+		heat_sys.run(heat_sys.init_sys())
+		step_time = (time.perf_counter() - start)/10
+		steps = max(per_cell2)*grid**2
+
+		start = time.perf_counter()
+		heat_sys.steady_state(method='lu')
+		lu_time = time.perf_counter() - start
+		print('%6d %11.0f* %11.0f* %12.3f %12s %10s' % (grid, steps, steps*step_time, lu_time, '-', '-'))
+	print('* estimated from the step rate and the steps the small grids needed')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+#Throughput of the batch sweep engine
+#Runs the same sweep of independent systems on 1 to N worker processes and
+#checks every worker count gives the same summary rows
+#Each worker compiles the kernels on its first run, the median run time shows
+#the cost of a run without it
+
+import os
+import sys
+import csv
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import run_sweep, stat_names
+
+
+def read_rows(path):
+	with open(path, newline='') as inp:
+		return {row['run_id']: row for row in csv.DictReader(inp)}
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+	spec = {'base': {'runtime': 4000, 'rate': 400, 'grid': 200, 'shape': shape},
+		'grid': {'ob_temp': [2, 3, 4, 5], 'bk_tp': [5e-7, 1e-6, 1.5e-6, 2e-6]}}
+	runs = len(spec['grid']['ob_temp'])*len(spec['grid']['bk_tp'])
+	cores = os.cpu_count()
+
+	print('%d runs of grid %d, %d cores' % (runs, spec['base']['grid'], cores))
+	print('%8s %10s %10s %14s %8s %6s' % ('workers', 'time (s)', 'runs/s', 'median run (s)', 'speedup', 'equal'))
+
+	ref = None
+	base = None
+	workers = 1
+	with tempfile.TemporaryDirectory() as tmp:
+		while True:
+			out = os.path.join(tmp, 'sweep_%d.csv' % workers)
+			start = time.perf_counter()
+			run_sweep(spec, out, workers)
+			elapsed = time.perf_counter() - start
+			rows = read_rows(out)
+			final = {k: [float(row['final_' + name]) for name in stat_names] for k, row in rows.items()}
+			if ref is None:
+				ref = final
+				base = elapsed
+			equal = set(final) == set(ref) and all(np.allclose(final[k], ref[k], equal_nan=True) for k in ref)
+			median = np.median([float(row['wall_s']) for row in rows.values()])
+			print('%8d %10.3f %10.2f %14.3f %7.2fx %6s' % (workers, elapsed, runs/elapsed, median, base/elapsed, equal))
+			if workers >= cores:
+				break
+			workers = min(2*workers, cores)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+#Benchmark of temporal blocking in heat_jump
+#Compares one step per sweep (heat_jump) with k steps per memory pass
+#(heat_jump_tb) on large grids and checks the frames are identical
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from heat_project import heat_system, tblock_band
+
+
+#best of repeat runs, returns (steps/s, gtot)
+def time_run(heat_sys, repeat=3):
+	best = 0
+	for r in range(repeat):
+		gtot = heat_sys.init_sys()
+		start = time.perf_counter()
+		gtot = heat_sys.run(gtot)
+		steps = (heat_sys.runtime//heat_sys.rate - 1)*heat_sys.rate
+		best = max(best, steps/(time.perf_counter() - start))
+	return best, gtot
+
+
+def main():
+	shape = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shapes', 'project_gear.png')
+	#(grid, runtime), two frames are stored per run
+	cases = [(1000, 100), (2000, 40), (3000, 20)]
+	blocks = [4, 8, 16]
+
+	#warm up the jit so compile time is not measured
+	small = heat_system(20, 10, 100, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+	small.run(small.init_sys())
+	small.tblock = 4
+	small.run(small.init_sys())
+
+	head = '%6s %12s' % ('grid', 'k=1 st/s')
+	for k in blocks:
+		head += ' %12s' % ('k=%d st/s' % k)
+	print(head + ' %6s' % 'equal')
+
+	for grid, runtime in cases:
+		heat_sys = heat_system(runtime, runtime//2, grid, 1, 1, 1, 1, 1e-6, 2e-5, 1, 5)
+		heat_sys.get_shape(shape)
+		rate, ref = time_run(heat_sys)
+		line = '%6d %12.1f' % (grid, rate)
+		equal = True
+		for k in blocks:
+			heat_sys.tblock = k
+			rate, gtot = time_run(heat_sys)
+			line += ' %12.1f' % rate
+			equal = equal and np.array_equal(ref, gtot)
+		print(line + ' %6s' % equal)
+
+
+if __name__ == '__main__':
+	main()
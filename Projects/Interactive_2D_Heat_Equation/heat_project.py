@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 
+import os
+import sys
+import csv
+import json
+import time
+import zlib
+import shutil
+import hashlib
+import argparse
+import itertools
+import multiprocessing
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from PIL import Image
-from numba import jit
+from numba import jit, prange, set_num_threads, config
 import curses
 
 
@@ -25,51 +33,439 @@ class heat_system(object):
 		self.ob_temp = ob_temp
 		#Assumes that there is no object unless defined with get_shape()
 		self.is_ob = np.zeros((self.grid,self.grid),dtype=bool)
+		self.ob_spans = None #row spans of the object cells, set by get_spans()
+		self.bk_spans = None #row spans of the interior background cells
 		self.dt = 1 #UNITS seconds
 		self.x_size = self.grid//100 #size in meters
 		self.dx = 0.01#m UNITS: meters  dx is 1 cm
+		self.alph = None #set by init_sys() once the shape is known
+		self.tile = 0 #column strip width for the kernels, 0 sweeps whole rows
+		self.threads = 1 #threads for the solver, more than 1 uses the parallel kernels
+		self.tblock = 0 #steps per memory pass for temporal blocking, 0 or 1 is off
+		self.band = 0 #rows per temporal block, 0 picks a size that fits in cache
+		self.active = 0 #tile size for skipping tiles that can no longer change (FTCS), 0 updates every cell
+		self.amr = 0 #block size for adaptive mesh refinement (FTCS, see amr_grid), 0 solves every cell on the grid
+		self.amr_tol = 0.05 #temperature difference of neighbouring coarse cells in K that refines a block
+		self.cells_run = 0 #cell updates of the last AMR run
+		self.frame_path = 'heat_frames.npy' #where the curses modes stream the saved frames
+		self.tol = 0.0 #stop once the max temperature change per step drops below this, 0 runs the full runtime
+		self.frames_run = 0 #frames produced by the last run
+		self.steps_saved = 0 #steps the last run skipped by stopping at steady state
+		self.scheme = 'ftcs' #'ftcs' explicit, or implicit 'be' backward Euler, 'cn' Crank-Nicolson, 'adi' ADI
+		self.implicit = None #multigrid or ADI factors for the implicit schemes, built on first use
+		self.adaptive = 0.0 #error allowed per step for adaptive 'adi' time steps in K, 0 keeps dt fixed
+		self.adaptive_dt = None #next time step of an adaptive run, kept in checkpoints so a resumed run continues with it
+		self.steps_run = 0 #time steps taken by the last run
+		self.stats = None #per frame statistics of the last run, one row per frame, columns stat_names
+		self.dtype = 'float64' #'float32' computes and stores in single precision
+		self.store = None #frame storage of a float64 run: 'float32', 'float16' or 'uint16' (quantized), None keeps dtype
+		self.qscale = 1.0 #uint16 frames hold (T - qoffset)/qscale, set by set_quant()
+		self.qoffset = 0.0
 
 
 #Define shape array 
 ##SHAPE MUST BE DEFINED BEFORE init_sys() to set object temp
-#THE SIZE SHAPE PIXELS MUST BE SQUARE AND WHOLE FACTOR OF GRID SIZE
-#OR ELSE NO SHAPE WILL BE SET
-	def get_shape(self, pathtoshape):
-		im = np.mean(np.array(Image.open(pathtoshape)),axis=2)
-		is_ob = im<100
-		if len(is_ob)==len(is_ob[0]): #check pixels are square
-			if not (self.grid%len(is_ob)): #check grid is evenly divisible by shape
-				scale = self.grid // len(is_ob)
-				is_ob = np.repeat(np.repeat(is_ob,scale,axis=0),scale,axis=1)
-				self.is_ob = is_ob
+#The shape image is scaled to the grid, see load_mask(). The mask is shared with
+#other systems using the same shape and is read only
+	def get_shape(self, pathtoshape, cache_dir=None):
+		self.is_ob = load_mask(pathtoshape, self.grid, cache_dir)
+		self.get_spans()
 
 #initialize pixels for simulation
-	def init_sys(self):
+#with a path gtot is an .npy file on disk opened as a np.memmap, the kernels write
+#frames straight into it so the history can be larger than RAM
+#frames are stored in frame_dtype(), uint16 frames as codes (see set_quant)
+	def init_sys(self, path=None):
 		frames = self.runtime // self.rate
-		gtot = np.zeros((frames , self.grid , self.grid))
+		if path is None:
+			gtot = np.zeros((frames , self.grid , self.grid), dtype=self.frame_dtype())
+		else:
+			gtot = np.lib.format.open_memmap(path, mode='w+', dtype=self.frame_dtype(), shape=(frames, self.grid, self.grid))
+		g = self.init_grid()
+		self.set_quant(g)
+		gtot[0] = self.encode(g)
+		return gtot
+
+#initialize only the first frame, for runs that stream frames with run_stream()
+	def init_grid(self):
+		g = np.zeros((self.grid, self.grid), dtype=self.dtype)
 		
 		#set background temp
-		gtot[0] = self.bk_temp
+		g[:] = self.bk_temp
 		
 		#set object temperature
-		gtot[0][self.is_ob] = self.ob_temp
+		self.get_spans()
+		fill_spans(g, self.ob_spans, self.ob_temp)
 		
 		#set edges 
-		gtot[0,:,0] = self.left
-		gtot[0,:,-1] = self.right
-		gtot[0,0,:] = self.top
-		gtot[0,-1,:] = self.bottom
-	
+		g[:,0] = self.left
+		g[:,-1] = self.right
+		g[0,:] = self.top
+		g[-1,:] = self.bottom
+		
+		#per cell diffusivity used by the kernels
+		self.get_alph()
+		
+		return g
+
+#Run the simulation on gtot from init_sys() with the kernel picked by the solver settings
+#returns gtot trimmed to the frames produced if the run stopped at steady state
+#With a store dtype the frames are computed in dtype and saved through encode(), the
+#result reads back as float64 frames (see decoded). g is the start grid, by default
+#gtot[0], which loses the store precision
+	def run(self, gtot, g=None):
+		steps = self.frame_steps()
+		total = self.runtime // self.rate * steps
+		if self.scheme != 'ftcs' or self.store is not None or self.active > 0 or self.amr > 0:
+			if g is None:
+				g = decode_frame(gtot[0], self.qscale, self.qoffset)
+			for f, frame in self.frames(g):
+				gtot[f] = self.encode(frame)
+			return self.decoded(gtot[:self.frames_run])
+		stats = np.zeros((self.runtime // self.rate, len(stat_names)))
+		if self.tblock > 1:
+			band = self.band if self.band > 0 else tblock_band(self.grid, self.tblock)
+			gtot = heat_jump_tb(gtot, self.alph, total, steps, self.tblock, band, self.tol, stats, self.ob_spans, self.bk_spans)
+		elif self.threads > 1:
+			set_num_threads(min(self.threads, config.NUMBA_NUM_THREADS))
+			gtot = heat_jump_par(gtot, self.alph, total, steps, self.tol, stats, self.ob_spans, self.bk_spans)
+		else:
+			gtot = heat_jump(gtot, self.alph, total, steps, self.tile, self.tol, stats, self.ob_spans, self.bk_spans)
+		self.set_frames_run(len(gtot))
+		self.steps_run = (len(gtot) - 1)*steps
+		self.stats = self.scale_stats(stats[:len(gtot)])
 		return gtot
 
+#dtype the saved frames are kept in
+	def frame_dtype(self):
+		return np.dtype(self.store or self.dtype)
+
+#Pick the uint16 scale and offset so the codes span the coldest to the hottest cell of
+#the start grid g. FTCS and backward Euler keep the maximum principle, no later
+#temperature leaves that range, so the quantization error is at most half a step of
+#(max - min)/65535. Crank-Nicolson and ADI overshoot at large dt and encode_frame
+#would clip them, so uint16 frames are refused for those schemes (see store_test)
+	def set_quant(self, g):
+		if not self.store_test():
+			raise ValueError('uint16 frames need a scheme that keeps the maximum principle (ftcs or be)')
+		self.qscale, self.qoffset = quant_range(g)
+
+#Frame g converted to frame_dtype() for storage
+	def encode(self, g):
+		return encode_frame(g, self.frame_dtype(), self.qscale, self.qoffset)
+
+#Stored frames as something that reads back float64 frames, gtot itself without a store dtype
+	def decoded(self, gtot):
+		if self.store is None:
+			return gtot
+		return decoded_frames(gtot, self.qscale, self.qoffset)
+
+#Convert ob_heat and flux of frame_stats() rows from cell units to K m^2 and K m^2/s
+	def scale_stats(self, stats):
+		stats[...,3] *= self.dx**2
+		stats[...,5] *= self.dx**2 / self.dt
+		return stats
+
+#Time steps of dt between saved frames
+	def frame_steps(self):
+		return int(round(self.rate / self.dt))
+
+#Largest dt FTCS is stable with, alph = tp*dt/dx**2 must stay at most 1/4 in every cell
+	def max_stable_dt(self):
+		return self.dx**2 / (4*max(self.bk_tp, self.ob_tp))
+
+#Set dt to the largest stable FTCS step that still fits a whole number of times in rate
+#so frames land exactly on the rate times, slow materials get long steps
+	def auto_dt(self):
+		self.dt = self.rate / int(np.ceil(self.rate / self.max_stable_dt()))
+		self.get_alph()
+		return self.dt
+
+#Record how many frames a run produced and how many steps stopping early saved
+	def set_frames_run(self, frames):
+		self.frames_run = frames
+		self.steps_saved = (self.runtime // self.rate - frames)*self.frame_steps()
+
+#Generator of the saved frames of the simulation starting from grid g
+#yields (frame index, grid), only two working grids are kept in memory
+#the yielded grid is overwritten when the next frame is computed, copy it to keep it
+#with start > 0, g is frame start of a run and the frames after it are yielded
+	def frames(self, g, start=0):
+		g = np.array(g, dtype=self.dtype)
+		ng = g.copy()
+		steps = self.frame_steps()
+		if self.tblock > 1:
+			band = self.band if self.band > 0 else tblock_band(self.grid, self.tblock)
+			a = np.empty((band + 2*self.tblock, self.grid), dtype=self.dtype)
+			b = np.empty((band + 2*self.tblock, self.grid), dtype=self.dtype)
+		elif self.threads > 1:
+			set_num_threads(min(self.threads, config.NUMBA_NUM_THREADS))
+		if self.active > 0:
+			tiles = (self.grid - 2 + self.active - 1) // self.active
+			flags = np.ones((2, tiles, tiles), dtype=np.bool_)
+		if self.amr > 0 and self.scheme == 'ftcs':
+			mesh = amr_grid(g, self.alph, self.is_ob, self.amr, self.amr_tol)
+			self.cells_run = 0
+		
+		dt = self.adaptive_dt if start > 0 and self.adaptive_dt else self.dt
+		stats = np.full((self.runtime // self.rate, len(stat_names)), np.nan)
+		
+		if start == 0:
+			self.set_frames_run(1)
+			self.steps_run = 0
+			frame_stats(g, self.ob_spans, self.bk_spans, self.alph, stats[0])
+			self.scale_stats(stats[0])
+			self.stats = stats[:1]
+			yield 0, g
+		for f in range(start+1, self.runtime // self.rate):
+			if self.scheme == 'adi' and self.adaptive > 0:
+				g, ng, dt, taken = self.adaptive_advance(g, dt)
+				self.adaptive_dt = dt
+				steps = taken
+				last = 1
+			elif self.scheme != 'ftcs':
+				g, ng = self.implicit_advance(g, ng, steps)
+				last = 1
+			elif self.active > 0:
+				g, ng, updated = heat_advance_active(g, ng, self.alph, steps, self.active, flags, self.threads > 1)
+				last = 1
+			elif self.amr > 0:
+				#ng gets the step before the last so tol compares single steps like the other kernels
+				mesh.advance(steps - 1)
+				mesh.composite(ng)
+				mesh.advance(1)
+				mesh.composite(g)
+				self.cells_run = mesh.updated
+				last = 1
+			elif self.tblock > 1:
+				g, ng = heat_advance_tb(g, ng, self.alph, steps, self.tblock, band, a, b)
+				last = steps % self.tblock or self.tblock
+			elif self.threads > 1:
+				g, ng = heat_advance_par(g, ng, self.alph, steps)
+				last = 1
+			else:
+				g, ng = heat_advance(g, ng, self.alph, steps, self.tile)
+				last = 1
+			self.set_frames_run(f+1)
+			self.steps_run += steps
+			frame_stats(g, self.ob_spans, self.bk_spans, self.alph, stats[f])
+			self.scale_stats(stats[f])
+			self.stats = stats[:f+1]
+			yield f, g
+			if self.tol > 0 and max_change(g, ng)/last < self.tol:
+				return
+
+#Run the simulation from grid g and hand every saved frame to sink(f, g)
+#sink can be any callable, e.g. a frame_writer or a function collecting statistics
+	def run_stream(self, g, sink):
+		for f, frame in self.frames(g):
+			sink(f, frame)
+
+#Run like run_stream() and save a checkpoint to ckpt_path every so often
+#The time between checkpoints is the last checkpoint write time / overhead, so
+#writing them costs at most about overhead (default 1%) of the run time
+#To resume after a crash: heat_sys, g, f = load_checkpoint(ckpt_path) and
+#heat_sys.run_checkpoint(g, sink, ckpt_path, start=f) with a sink that continues
+#after frame f, e.g. frame_writer(path, frames, grid, start=f+1)
+	def run_checkpoint(self, g, sink, ckpt_path, overhead=0.01, start=0):
+		write_time = 0.0
+		last = time.perf_counter()
+		for f, frame in self.frames(g, start):
+			sink(f, frame)
+			if time.perf_counter() - last >= write_time / overhead:
+				if hasattr(sink, 'flush'):
+					sink.flush()
+				begin = time.perf_counter()
+				self.save_checkpoint(ckpt_path, frame, f)
+				last = time.perf_counter()
+				write_time = last - begin
+
+#Save grid g (frame f of the run), the step counter and the settings to path
+#Written to a temporary file first so a crash while saving keeps the old checkpoint
+	def save_checkpoint(self, path, g, f):
+		tmp = path + '.tmp'
+		with open(tmp, 'wb') as out:
+			np.savez(out, g=g, is_ob=self.is_ob, frame=f, step=f*self.frame_steps(), params=json.dumps(self.params()))
+		os.replace(tmp, path)
+
+#Settings of the system as a dict of plain values, used for checkpoints and saved results
+	def params(self):
+		return {'runtime': self.runtime, 'rate': self.rate, 'grid': self.grid,
+			'top': self.top, 'right': self.right, 'bottom': self.bottom, 'left': self.left,
+			'bk_tp': self.bk_tp, 'ob_tp': self.ob_tp, 'bk_temp': self.bk_temp, 'ob_temp': self.ob_temp,
+			'dt': self.dt, 'dx': self.dx, 'tile': self.tile, 'threads': self.threads,
+			'tblock': self.tblock, 'band': self.band, 'active': self.active, 'amr': self.amr, 'amr_tol': self.amr_tol, 'scheme': self.scheme, 'adaptive': self.adaptive,
+			'dtype': self.dtype, 'store': self.store, 'tol': self.tol, 'qscale': self.qscale, 'qoffset': self.qoffset,
+			'adaptive_dt': self.adaptive_dt}
+
+#Stream the frames from grid g into frame_path and open them again read only
+#frames are read from disk as they are used so the history never has to fit in RAM
+	def run_to_disk(self, g):
+		self.set_quant(g)
+		sink = frame_writer(self.frame_path, self.runtime // self.rate, self.grid, dtype=self.frame_dtype(), encode=self.encode)
+		self.run_stream(g, sink)
+		sink.close()
+		return self.decoded(np.load(self.frame_path, mmap_mode='r'))
+
+#Advance a single grid one step with the kernel picked by the solver settings
+	def step(self, g):
+		if self.scheme != 'ftcs':
+			return self.implicit_advance(g, g.copy(), 1)[0]
+		if self.threads > 1:
+			set_num_threads(min(self.threads, config.NUMBA_NUM_THREADS))
+			return heat_step_par(g, self.alph)
+		return heat_step(g, self.alph, self.tile)
+
+#Advance g by nsteps implicit steps of dt with the scheme in self.scheme, ng is a work grid
+#All three are stable for any dt, so dt is only limited by the accuracy wanted
+#'be' backward Euler (I - alph*L) g' = g, first order in time, damps every mode
+#'cn' Crank-Nicolson (I - alph/2*L) g' = (I + alph/2*L) g, second order in time but
+#     sharp features such as object edges ring for a while when alph is large
+#'adi' Peaceman-Rachford ADI, Crank-Nicolson split into a half step implicit along rows
+#     and one implicit along columns, so every solve is a tridiagonal line solve
+#L is the 5 point Laplacian with the edges held constant, as in the FTCS kernels.
+#'be' and 'cn' solve the full 2D system with multigrid (needs scipy), dividing each
+#row by alph so the matrix is diag(s) - L with s = 1/alph or 2/alph
+#returns (g, ng) like the heat_advance kernels
+	def implicit_advance(self, g, ng, nsteps):
+		if self.implicit is None:
+			self.implicit = self.implicit_setup(g)
+		if self.scheme == 'adi':
+			h, cx, px, cy, py = self.implicit
+			return heat_advance_adi(g, ng, self.alph, nsteps, h, cx, px, cy, py)
+		
+		mg, s, edge = self.implicit
+		m = self.grid - 2
+		for k in range(nsteps):
+			rhs = s*g[1:-1,1:-1] + edge
+			if self.scheme == 'cn':
+				rhs += g[:-2,1:-1] + g[2:,1:-1] + g[1:-1,:-2] + g[1:-1,2:] - 4*g[1:-1,1:-1]
+			ng[1:-1,1:-1] = mg.solve(rhs, x0=g[1:-1,1:-1], tol=1e-8).reshape(m, m)
+			g, ng = ng, g
+		return g, ng
+
+#Advance g by one frame (rate seconds) of ADI steps with an adaptive dt, starting at dt
+#Each step is taken once with dt and once as two steps of dt/2. Their difference
+#estimates the error of the step, which is accepted (keeping the two half steps) when
+#it is below self.adaptive. ADI is second order, so the error goes as dt**3 and the next
+#dt is scaled by (self.adaptive/error)**(1/3), at most doubling. dt grows as the field
+#relaxes, the last step is cut short so the frame lands on the rate time.
+#returns (grid, grid one step earlier, dt for the next step, steps taken)
+	def adaptive_advance(self, g, dt):
+		t = 0.0
+		taken = 0
+		prev = g
+		while self.rate - t > 1e-9*self.rate:
+			step = min(dt, self.rate - t)
+			full = self.adi_steps(g, step, 1)
+			half = self.adi_steps(g, step/2, 2)
+			err = abs(full - half).max()
+			if err <= self.adaptive:
+				prev, g = g, half
+				t += step
+				taken += 2
+			factor = 2.0 if err == 0 else min(2.0, max(0.2, 0.9*(self.adaptive/err)**(1/3)))
+			if err <= self.adaptive and step < dt:
+				dt = max(dt, step*factor)
+			else:
+				dt = step*factor
+		return g, prev, dt, taken
+
+#nsteps ADI steps of length dt from g into a new grid, for steps other than self.dt
+	def adi_steps(self, g, dt, nsteps):
+		alph = self.alph_for(dt).astype(g.dtype)
+		cx, px, cy, py = adi_factor(alph)
+		g = g.copy()
+		return heat_advance_adi(g, g.copy(), alph, nsteps, g.copy(), cx, px, cy, py)[0]
+
+#Build what the implicit scheme needs from alph and the edges of g
+#is kept in self.implicit until alph changes
+	def implicit_setup(self, g):
+		if self.alph is None:
+			self.get_alph()
+		if self.scheme == 'adi':
+			cx, px, cy, py = adi_factor(self.alph)
+			return (np.array(g), cx, px, cy, py)
+		elif self.scheme == 'be':
+			s = 1/self.alph[1:-1,1:-1]
+		elif self.scheme == 'cn':
+			s = 2/self.alph[1:-1,1:-1]
+		else:
+			raise ValueError('Unknown scheme: ' + str(self.scheme))
+		return (multigrid(self.grid - 2, s), s, edge_rhs(g))
+
+#Solve directly for the final (steady state) temperature instead of time stepping
+#heat_jump stops changing when alph*(sum of 4 neighbours - 4*g) = 0 in every interior
+#cell, and as alph > 0 everywhere that is the discrete Laplace equation with the four
+#edges as Dirichlet conditions. is_ob and the diffusivities set how fast a run gets
+#there but not where it ends up, so the same sparse system is solved for any shape.
+#method 'lu' uses a sparse LU factorization, 'cg' conjugate gradient to rtol tol,
+#'mg' and 'mg-w' multigrid V or W cycles to a residual of tol (see multigrid)
+#g gives the edge temperatures (init_grid() by default), returns the steady grid
+#Needs scipy
+	def steady_state(self, g=None, method='lu', tol=1e-10):
+		import scipy.sparse.linalg as spla
+		if g is None:
+			g = self.init_grid()
+		g = np.array(g, dtype=np.float64)
+		m = self.grid - 2
+		
+		#known edge values move to the right hand side
+		rhs = edge_rhs(g)
+		
+		if method == 'lu':
+			A = laplace_matrix(m)
+			x = spla.splu(A, permc_spec='MMD_AT_PLUS_A').solve(rhs.ravel())
+		elif method == 'cg':
+			A = laplace_matrix(m)
+			x, info = spla.cg(A, rhs.ravel(), x0=g[1:-1,1:-1].ravel(), rtol=tol, maxiter=100*m*m)
+		elif method == 'mg' or method == 'mg-w':
+			mg = multigrid(m, cycle='W' if method == 'mg-w' else 'V')
+			x = mg.solve(rhs, x0=g[1:-1,1:-1], tol=tol)
+		else:
+			raise ValueError('Unknown steady state method: ' + str(method))
+		g[1:-1,1:-1] = x.reshape(m, m)
+		return g
+
+#Build per cell alpha = tp*dt/dx**2 from is_ob and the two diffusivities
+#Kernels read alph[j][i] so they don't have to branch on the material of each cell
+#More materials only need more values written into this array
+	def get_alph(self):
+		self.alph = self.alph_for(self.dt).astype(self.dtype)
+		self.implicit = None
+		return self.alph
+
+#Row spans (row, first column, end column) of the object cells and of the interior
+#background cells, so reductions over either only visit those cells
+#is_ob can be a bool array or a packed_mask, everything else is built from the spans
+	def get_spans(self):
+		self.ob_spans = mask_spans(self.is_ob)
+		self.bk_spans = span_gaps(self.ob_spans, self.grid, self.grid)
+		return self.ob_spans, self.bk_spans
+
+#Temperatures of the object cells of grid g, like g[is_ob] without scanning the whole grid
+	def object_values(self, g):
+		return span_values(g, self.ob_spans)
+
+#alph for a time step dt other than self.dt
+	def alph_for(self, dt):
+		bk_alph = (self.bk_tp*dt)/self.dx**2
+		ob_alph = (self.ob_tp*dt)/self.dx**2
+		alph = np.full((self.grid, self.grid), bk_alph)
+		fill_spans(alph, mask_spans(self.is_ob), ob_alph)
+		return alph
+
 
 ########TEST FUNCTIONS
 ########Return True for pass, False for fail
 
 #Run a stability test for system given specified tp
+#the implicit schemes are stable for any tp, they only need it to be positive
 	def tp_test(self, tp):
+		if self.scheme != 'ftcs':
+			return tp > 0
 		check = (self.dx**2) / (4*self.dt)
-		return tp <= check #tp must be less than 2.5e-5
+		return tp <= check #tp must be at most dx^2/(4 dt), auto_dt() picks dt to pass
 		
 #tests input resolution
 #must be multiple of 100
@@ -78,70 +474,1455 @@ class heat_system(object):
 	
 #tests input framerate and runtime
 #framerate must be factor of runtime and less than runtime
+#and a whole number of time steps dt unless dt is adaptive
 	def rate_test(self):
-		return not self.runtime%self.rate
+		if self.scheme == 'adi' and self.adaptive > 0:
+			return not self.runtime%self.rate
+		steps = self.frame_steps()
+		return not self.runtime%self.rate and steps > 0 and abs(steps*self.dt - self.rate) < 1e-9*self.rate
+
+#tests frame storage
+#uint16 codes only cover the start grid's range, which CN and ADI can overshoot
+	def store_test(self):
+		return not (self.frame_dtype() == np.uint16 and self.scheme in ('cn', 'adi'))
 
 #tests gtot size
-#makes sure resulting array is not too large
+#makes sure the saved frames fit in the free disk space where they are streamed to
 	def size_test(self):
-		max_npsize= 7.5e7
-		return max_npsize > ((self.runtime//self.rate)*self.grid**2)
+		frame_dir = os.path.dirname(os.path.abspath(self.frame_path))
+		nbytes = self.frame_dtype().itemsize*(self.runtime//self.rate)*self.grid**2
+		return nbytes < shutil.disk_usage(frame_dir).free
 
 
 ################################################################################################################
 #end of system class
 
+
+#Solver settings of heat_system besides the constructor arguments, kept by params()
+setting_keys = ['dt', 'dx', 'tile', 'threads', 'tblock', 'band', 'active', 'amr', 'amr_tol', 'scheme', 'adaptive', 'dtype', 'store', 'tol', 'qscale', 'qoffset', 'adaptive_dt']
+
+
+#Build a heat_system from a dict of settings as given by heat_system.params()
+#settings missing from p keep their defaults
+def system_from_params(p):
+	heat_sys = heat_system(p['runtime'], p['rate'], p['grid'], p['top'], p['right'], p['bottom'], p['left'], p['bk_tp'], p['ob_tp'], p['bk_temp'], p['ob_temp'])
+	for key in setting_keys:
+		if key in p:
+			setattr(heat_sys, key, p[key])
+	return heat_sys
+
+
+#Load a checkpoint saved by heat_system.run_checkpoint()
+#returns (heat_system, grid, frame index) ready to resume the run from
+def load_checkpoint(path):
+	with np.load(path) as ckpt:
+		p = json.loads(str(ckpt['params']))
+		heat_sys = system_from_params(p)
+		heat_sys.is_ob = ckpt['is_ob']
+		heat_sys.get_alph()
+		heat_sys.get_spans()
+		return heat_sys, ckpt['g'], int(ckpt['frame'])
+
+
+#Object masks already loaded, keyed by (path, mtime, grid), and the thresholded
+#images they were scaled from keyed by (path, mtime)
+mask_cache = {}
+shape_cache = {}
+
+
+#Object mask of the shape image at path on a grid x grid system, dark pixels (mean
+#of the channels below 100) are the object. Each pixel covers grid/size cells: a
+#whole number of cells are copied from a broadcast view of the image, otherwise
+#every cell takes the pixel nearest its center. Masks are cached in memory by
+#(path, mtime, grid) so repeated runs skip decoding and scaling, and with cache_dir
+#also on disk as packed bits. The returned mask is read only.
+def load_mask(path, grid, cache_dir=None):
+	mtime = os.stat(path).st_mtime_ns
+	key = (os.path.abspath(path), mtime, grid)
+	if key in mask_cache:
+		return mask_cache[key]
+	
+	cached = None
+	if cache_dir is not None:
+		name = hashlib.sha1(repr(key).encode()).hexdigest()[:16] + '.npy'
+		cached = os.path.join(cache_dir, name)
+		if os.path.exists(cached):
+			mask = np.unpackbits(np.load(cached), count=grid*grid).reshape(grid, grid).view(bool)
+			mask.setflags(write=False)
+			mask_cache[key] = mask
+			return mask
+	
+	if key[:2] not in shape_cache:
+		from PIL import Image
+		im = np.asarray(Image.open(path))
+		if im.ndim == 2:
+			im = im[:,:,None]
+		#integer sum of the channels, same test as their mean < 100 without float copies
+		shape_cache[key[:2]] = im.sum(axis=2, dtype=np.int32) < 100*im.shape[2]
+	shape = shape_cache[key[:2]]
+	
+	h, w = shape.shape
+	if not (grid % h or grid % w):
+		#widen the image rows once, then copy each whole row sy times from a broadcast view
+		wide = np.repeat(shape, grid // w, axis=1)
+		mask = np.broadcast_to(wide[:,None,:], (h, grid // h, grid)).reshape(grid, grid)
+	else:
+		rows = ((2*np.arange(grid) + 1)*h) // (2*grid)
+		cols = ((2*np.arange(grid) + 1)*w) // (2*grid)
+		mask = shape[rows[:,None], cols[None,:]]
+	mask.setflags(write=False)
+	mask_cache[key] = mask
+	
+	if cached is not None:
+		os.makedirs(cache_dir, exist_ok=True)
+		tmp = cached + '.tmp.npy'
+		np.save(tmp, np.packbits(mask))
+		os.replace(tmp, cached)
+	return mask
+
+
+#Run length encode a 2D boolean mask or a packed_mask into row spans
+#returns an int array with one (row, first column, end column) per run of True cells,
+#in row major order, so mask[r, c0:c1] is all True for every span
+def mask_spans(mask):
+	if isinstance(mask, packed_mask):
+		return mask.spans()
+	padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+	padded[:,1:-1] = mask
+	d = np.diff(padded, axis=1)
+	rows, starts = np.nonzero(d == 1)
+	stops = np.nonzero(d == -1)[1]
+	return np.stack([rows, starts, stops], axis=1).astype(np.int64)
+
+
+#Bits set in each of the 256 byte values, for counting packed bits
+byte_bits = np.array([bin(b).count('1') for b in range(256)], dtype=np.uint8)
+
+
+#Object mask stored as bits, each row packed into (width+7)//8 bytes with np.packbits
+#so a mask takes 1/8 of the memory of a bool array (125 kB instead of 1 MB at 1000^2).
+#count(), bbox() and spans() work on the packed bytes, skipping bytes that are all
+#0 or all 1, and row() unpacks a single row. np.asarray() gives the bool array back.
+class packed_mask(object):
+	def __init__(self, mask):
+		mask = np.asarray(mask, dtype=bool)
+		self.shape = mask.shape
+		self.bits = np.packbits(mask, axis=1)
+		self.bits.setflags(write=False)
+	
+	@property
+	def nbytes(self):
+		return self.bits.nbytes
+	
+	def __array__(self, dtype=None, copy=None):
+		return self.unpack() if dtype is None else self.unpack().astype(dtype)
+	
+	#bool array of the whole mask
+	def unpack(self):
+		return np.unpackbits(self.bits, axis=1, count=self.shape[1]).view(bool)
+	
+	#bool array of row j
+	def row(self, j):
+		return np.unpackbits(self.bits[j], count=self.shape[1]).view(bool)
+	
+	#number of True cells
+	def count(self):
+		return int(byte_bits[self.bits].sum(dtype=np.int64))
+	
+	#(first row, end row, first column, end column) of the True cells, None if there are none
+	def bbox(self):
+		rows = np.flatnonzero(self.bits.any(axis=1))
+		if len(rows) == 0:
+			return None
+		cols = np.flatnonzero(np.unpackbits(np.bitwise_or.reduce(self.bits, axis=0), count=self.shape[1]))
+		return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+	
+	#row spans like mask_spans() of the unpacked mask
+	def spans(self):
+		n = packed_spans(self.bits, self.shape[1], np.empty((0, 3), dtype=np.int64))
+		out = np.empty((n, 3), dtype=np.int64)
+		packed_spans(self.bits, self.shape[1], out)
+		return out
+
+
+#Right hand side that the constant edges of grid g add to a solve for its interior cells
+def edge_rhs(g):
+	rhs = np.zeros((g.shape[0] - 2, g.shape[1] - 2))
+	rhs[0,:] += g[0,1:-1]
+	rhs[-1,:] += g[-1,1:-1]
+	rhs[:,0] += g[1:-1,0]
+	rhs[:,-1] += g[1:-1,-1]
+	return rhs
+
+
+#Sparse matrix of -(discrete Laplacian) for the m x m interior cells of a grid
+#4 on the diagonal and -1 for each interior neighbour, symmetric positive definite
+def laplace_matrix(m):
+	import scipy.sparse as sp
+	T = sp.diags([-1.0, 2.0, -1.0], [-1, 0, 1], shape=(m, m))
+	I = sp.identity(m)
+	return (sp.kron(I, T) + sp.kron(T, I)).tocsc()
+
+
+#Linear interpolation onto an n point line from every second point of it
+#The two end points are always kept, so the last coarse gap is one cell when n is even
+#Returns the n x nc interpolation matrix
+def interp_matrix(n):
+	import scipy.sparse as sp
+	c = np.arange(0, n, 2)
+	if c[-1] != n - 1:
+		c = np.append(c, n - 1)
+	rows = [n - 1]
+	cols = [len(c) - 1]
+	vals = [1.0]
+	for k in range(len(c) - 1):
+		for f in range(c[k], c[k+1]):
+			w = (f - c[k])/(c[k+1] - c[k])
+			rows += [f, f]
+			cols += [k, k + 1]
+			vals += [1.0 - w, w]
+	P = sp.csr_matrix((vals, (rows, cols)), shape=(n, len(c)))
+	P.eliminate_zeros()
+	return P
+
+
+#Geometric multigrid for (diag(s) - Laplacian) x = b on the m x m interior cells of a grid
+#s is a per cell coefficient field (an m x m array, zero for the steady state; 1/alph
+#gives the backward Euler step of the is_ob diffusivities). The edges are constant, so
+#corrections are zero there and only interior points are coarsened: every second grid
+#line is kept along with the edges, and bilinear interpolation P brings corrections back.
+#Coarse operators are P^T A P, which restricts s (and any is_ob jump in it) with the
+#same weights as the residual. Gauss-Seidel smooths on every level and the coarsest
+#one (at most 16 x 16) is factorized directly.
+#cycle 'V' visits each coarse level once per cycle, 'W' twice
+#Needs scipy
+class multigrid(object):
+	def __init__(self, m, s=None, cycle='V', pre=2, post=2):
+		import scipy.sparse as sp
+		import scipy.sparse.linalg as spla
+		if cycle not in ('V', 'W'):
+			raise ValueError('Unknown multigrid cycle: ' + str(cycle))
+		self.m = m
+		self.gamma = 1 if cycle == 'V' else 2
+		self.pre = pre
+		self.post = post
+		self.cycles = 0
+		
+		A = laplace_matrix(m).tocsr()
+		if s is not None:
+			A = (A + sp.diags(np.ravel(s))).tocsr()
+		self.A = [A]
+		self.P = []
+		self.R = []
+		while m > 16:
+			P1 = interp_matrix(m + 2)[1:-1,1:-1]
+			P = sp.kron(P1, P1).tocsr()
+			R = P.T.tocsr()
+			A = (R @ A @ P).tocsr()
+			A.sort_indices()
+			self.P.append(P)
+			self.R.append(R)
+			self.A.append(A)
+			m = P1.shape[1]
+		self.coarse = spla.splu(self.A[-1].tocsc())
+
+#One cycle on level lvl, improving x in place for right hand side b
+	def cycle(self, lvl, x, b):
+		A = self.A[lvl]
+		if lvl == len(self.P):
+			x[:] = self.coarse.solve(b)
+			return x
+		gauss_seidel(A.indptr, A.indices, A.data, x, b, self.pre, False)
+		rc = self.R[lvl] @ (b - A @ x)
+		ec = np.zeros(len(rc))
+		for k in range(self.gamma):
+			self.cycle(lvl + 1, ec, rc)
+		x += self.P[lvl] @ ec
+		gauss_seidel(A.indptr, A.indices, A.data, x, b, self.post, True)
+		return x
+
+#Cycle until the residual is below tol times that of b, the cycles taken are kept in self.cycles
+	def solve(self, b, x0=None, tol=1e-10, maxiter=100):
+		b = np.ravel(b).astype(np.float64)
+		if x0 is None:
+			x = np.zeros(len(b))
+		else:
+			x = np.array(x0, dtype=np.float64).ravel()
+		A = self.A[0]
+		bnorm = np.linalg.norm(b)
+		self.cycles = 0
+		while np.linalg.norm(b - A @ x) > tol*bnorm and self.cycles < maxiter:
+			self.cycle(0, x, b)
+			self.cycles += 1
+		return x
+
+
+#Two level block structured AMR for FTCS runs (see amr_step)
+#The grid is cut into block x block blocks, each solved on the fine grid (the system's
+#dx) or on a coarse grid of twice the spacing with a quarter of the cells. Blocks on
+#the edges and blocks the object's boundary crosses are always fine, so coarse blocks
+#hold a single material. Every block/2 steps the blocks are regridded: blocks where
+#neighbouring coarse temperatures differ by more than tol (K) are refined along with
+#the blocks around them, the rest are coarsened. Newly refined blocks are filled by
+#limited linear interpolation and coarsened ones keep the mean of their fine cells,
+#both keep the heat in the block. g is the start grid, alph the system's fine alph.
+#block must be even and divide the grid
+class amr_grid(object):
+	def __init__(self, g, alph, is_ob, block=20, tol=0.05):
+		N = len(g)
+		if block % 2 or N % block:
+			raise ValueError('AMR block must be an even number of cells that divides the grid')
+		nb = N // block
+		self.block = block
+		self.tol = tol
+		self.tf = np.array(g)
+		self.nf = self.tf.copy()
+		self.af = alph
+		#coarse blocks have one material, a coarse cell has 4 times the heat capacity
+		self.ac = np.ascontiguousarray(alph[::2, ::2]) / 4
+		self.tc = self.tf.reshape(N//2, 2, N//2, 2).mean(axis=(1, 3))
+		self.nc = self.tc.copy()
+
+		mask = np.asarray(is_ob).reshape(nb, block, nb, block)
+		self.forced = mask.any(axis=(1, 3)) & ~mask.all(axis=(1, 3))
+		self.forced[0,:] = self.forced[-1,:] = self.forced[:,0] = self.forced[:,-1] = True
+		#the start grid is known on every fine cell, so refined blocks keep it as it is
+		self.refined = amr_flags(self.tc, block, tol, self.forced)
+		self.since = 0
+		self.updated = 0
+
+	def regrid(self):
+		amr_average(self.tf, self.tc, self.refined, self.block)
+		flags = amr_flags(self.tc, self.block, self.tol, self.forced)
+		for by, bx in zip(*np.nonzero(flags & ~self.refined)):
+			amr_prolong(self.tc, self.tf, self.block, by, bx)
+		self.refined = flags
+
+	#Advance nsteps steps, regridding every block/2 steps
+	def advance(self, nsteps):
+		every = self.block // 2
+		while nsteps > 0:
+			if self.since == every:
+				self.regrid()
+				self.since = 0
+			n = min(every - self.since, nsteps)
+			self.tf, self.nf, self.tc, self.nc, updated = amr_advance(self.tf, self.nf, self.tc, self.nc, self.af, self.ac, self.refined, self.block, n)
+			self.updated += updated
+			self.since += n
+			nsteps -= n
+
+	#Write the solution on the fine grid into out
+	def composite(self, out):
+		amr_composite(self.tf, self.tc, self.refined, self.block, out)
+		return out
+
+	#Share of the grid solved on the fine grid
+	def refined_share(self):
+		return self.refined.mean()
+
+	#Heat of the interior cells in the units the steps conserve, the sum of T/alph
+	#over the cells solved. It only changes by the heat through the constant edges
+	def heat(self):
+		fine = np.repeat(np.repeat(self.refined, self.block, axis=0), self.block, axis=1)
+		coarse = ~np.repeat(np.repeat(self.refined, self.block//2, axis=0), self.block//2, axis=1)
+		inner = (slice(1, -1), slice(1, -1))
+		return np.sum((self.tf/self.af)[inner][fine[inner]]) + np.sum((self.tc/self.ac)[coarse])
+
+
+#Scale and offset for uint16 frames covering the temperatures of grid g
+def quant_range(g):
+	lo = float(np.min(g))
+	hi = float(np.max(g))
+	return ((hi - lo)/65535 if hi > lo else 1.0), lo
+
+
+#Frame g converted to dtype for storage
+#uint16 frames hold the rounded codes (g - offset)/scale, other dtypes a plain cast
+def encode_frame(g, dtype, scale=1.0, offset=0.0):
+	if np.dtype(dtype) == np.uint16:
+		return np.clip(np.rint((g - offset)/scale), 0, 65535).astype(np.uint16)
+	return np.asarray(g, dtype=dtype)
+
+
+#Stored frame(s) q back as float64 temperatures
+def decode_frame(q, scale=1.0, offset=0.0):
+	if q.dtype == np.uint16:
+		return q*scale + offset
+	return np.asarray(q, dtype=np.float64)
+
+
+#Read only view of frames stored in a smaller dtype, frames[f] gives frame f as float64
+#so it can be passed to doub_plot and anim_plot; raw holds the stored frames
+class decoded_frames(object):
+	def __init__(self, raw, scale=1.0, offset=0.0):
+		self.raw = raw
+		self.scale = scale
+		self.offset = offset
+	
+	def __len__(self):
+		return len(self.raw)
+	
+	def __getitem__(self, f):
+		return decode_frame(self.raw[f], self.scale, self.offset)
+
+
+#Frame sink that writes every frame it is given to an .npy file
+#The file can be opened with np.load(path, mmap_mode='r') to read frames lazily
+#With start > 0 an existing file is reopened and written from frame start on (for resuming)
+#Frames are written as dtype, after passing through encode (e.g. heat_system.encode) if given
+#If the run stops early (steady state) close() trims the file to the frames written
+#######################################################################################################
+class frame_writer(object):
+	def __init__(self, path, frames, grid, start=0, dtype=np.float64, encode=None):
+		self.path = path
+		self.frames = frames
+		self.grid = grid
+		self.count = start
+		self.dtype = np.dtype(dtype)
+		self.encode = encode
+		self.fsize = grid*grid*self.dtype.itemsize
+		if start == 0:
+			self.out = open(path, 'wb')
+			self.write_header(frames)
+		else:
+			self.out = open(path, 'r+b')
+			np.lib.format.read_magic(self.out)
+			np.lib.format.read_array_header_1_0(self.out)
+		self.offset = self.out.tell()
+		self.out.seek(self.offset + start*self.fsize)
+	
+	def write_header(self, frames):
+		header = {'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False, 'shape': (frames, self.grid, self.grid)}
+		np.lib.format.write_array_header_1_0(self.out, header)
+	
+	def __call__(self, f, g):
+		if self.encode is not None:
+			g = self.encode(g)
+		self.out.write(np.ascontiguousarray(g, dtype=self.dtype).tobytes())
+		self.count += 1
+	
+	def flush(self):
+		self.out.flush()
+	
+	def close(self):
+		if self.count < self.frames:
+			self.out.seek(0)
+			self.write_header(self.count)
+			if self.out.tell() == self.offset:
+				self.out.truncate(self.offset + self.count*self.fsize)
+			else:
+				#header length changed, keep the full shape and leave the missing frames zero
+				self.out.seek(0)
+				self.write_header(self.frames)
+				self.out.truncate(self.offset + self.frames*self.fsize)
+		self.out.close()
+
+#######################################################################################################
+#end of frame writer class
+
+
+#Frame sink that saves a run as a directory of compressed chunks plus its settings
+#Frames are split into chunks of chunk[0] frames by chunk[1] x chunk[2] cells, each
+#chunk is byte shuffled (like the HDF5 shuffle filter) and zlib compressed, so one
+#frame or one cell's time series can be read back without decompressing the run
+#Files: meta.json (settings), is_ob.npy (object mask), t.j.i (chunk t, j, i)
+#Chunks hold frames in heat_sys.frame_dtype(), result_reader decodes them back to float64
+#######################################################################################################
+class result_writer(object):
+	def __init__(self, path, heat_sys, chunk=(8, 128, 128), level=1):
+		self.path = path
+		self.chunk = chunk
+		self.level = level
+		self.grid = heat_sys.grid
+		self.frames = heat_sys.runtime // heat_sys.rate
+		self.dtype = heat_sys.frame_dtype()
+		if not heat_sys.store_test():
+			raise ValueError('uint16 frames need a scheme that keeps the maximum principle (ftcs or be)')
+		#frames of the chunk being filled
+		self.buf = np.empty((chunk[0], self.grid, self.grid), dtype=self.dtype)
+		self.nbuf = 0
+		self.tc = 0
+		self.count = 0
+		
+		os.makedirs(path, exist_ok=True)
+		np.save(os.path.join(path, 'is_ob.npy'), heat_sys.is_ob)
+		self.meta = heat_sys.params()
+		self.meta['frames'] = self.frames
+		self.meta['chunk'] = list(chunk)
+		self.meta['frame_dtype'] = self.dtype.name
+		self.meta['qscale'] = 1.0
+		self.meta['qoffset'] = 0.0
+		self.write_meta()
+	
+	def write_meta(self):
+		with open(os.path.join(self.path, 'meta.json'), 'w') as out:
+			json.dump(self.meta, out, indent=1)
+	
+	#uint16 codes span the temperatures of the first frame written
+	def __call__(self, f, g):
+		if self.count == 0 and self.dtype == np.uint16:
+			self.meta['qscale'], self.meta['qoffset'] = quant_range(g)
+			self.write_meta()
+		self.buf[self.nbuf] = encode_frame(g, self.dtype, self.meta['qscale'], self.meta['qoffset'])
+		self.nbuf += 1
+		self.count += 1
+		if self.nbuf == self.chunk[0]:
+			self.write_chunk()
+	
+	#write the buffered frames as one row of chunks
+	def write_chunk(self):
+		if self.nbuf == 0:
+			return
+		ct, cy, cx = self.chunk
+		for j in range(0, self.grid, cy):
+			for i in range(0, self.grid, cx):
+				block = np.ascontiguousarray(self.buf[:self.nbuf, j:j+cy, i:i+cx])
+				shuffled = block.view(np.uint8).reshape(-1, self.dtype.itemsize).T.tobytes()
+				name = '%d.%d.%d' % (self.tc, j//cy, i//cx)
+				with open(os.path.join(self.path, name), 'wb') as out:
+					out.write(zlib.compress(shuffled, self.level))
+		self.tc += 1
+		self.nbuf = 0
+	
+	#the frame count is corrected if the run stopped early at steady state
+	def close(self):
+		self.write_chunk()
+		if self.count < self.frames:
+			self.meta['frames'] = self.count
+			self.write_meta()
+
+
+#Reads a run saved by result_writer, decompressing only the chunks it needs
+#reader[f] or reader.frame(f) gives frame f, reader.series(j, i) the temperature
+#of cell (j, i) in every frame, so a reader can be passed to doub_plot and anim_plot
+class result_reader(object):
+	def __init__(self, path):
+		self.path = path
+		with open(os.path.join(path, 'meta.json')) as inp:
+			self.meta = json.load(inp)
+		self.is_ob = np.load(os.path.join(path, 'is_ob.npy'))
+		self.grid = self.meta['grid']
+		self.frames = self.meta['frames']
+		self.chunk = tuple(self.meta['chunk'])
+		self.dtype = np.dtype(self.meta.get('frame_dtype', 'float64'))
+		self.qscale = self.meta.get('qscale', 1.0)
+		self.qoffset = self.meta.get('qoffset', 0.0)
+	
+	def __len__(self):
+		return self.frames
+	
+	def __getitem__(self, f):
+		return self.frame(f)
+	
+	#decompress chunk (tc, jc, ic), returns array of (frames, rows, columns)
+	def read_chunk(self, tc, jc, ic):
+		ct, cy, cx = self.chunk
+		shape = (min(ct, self.frames - tc*ct), min(cy, self.grid - jc*cy), min(cx, self.grid - ic*cx))
+		with open(os.path.join(self.path, '%d.%d.%d' % (tc, jc, ic)), 'rb') as inp:
+			shuffled = np.frombuffer(zlib.decompress(inp.read()), dtype=np.uint8)
+		return shuffled.reshape(self.dtype.itemsize, -1).T.copy().view(self.dtype).reshape(shape)
+	
+	def frame(self, f):
+		if f < 0:
+			f += self.frames
+		if f < 0 or f >= self.frames:
+			raise IndexError('frame out of range')
+		ct, cy, cx = self.chunk
+		g = np.empty((self.grid, self.grid), dtype=self.dtype)
+		for j in range(0, self.grid, cy):
+			for i in range(0, self.grid, cx):
+				g[j:j+cy, i:i+cx] = self.read_chunk(f//ct, j//cy, i//cx)[f % ct]
+		return decode_frame(g, self.qscale, self.qoffset)
+	
+	def series(self, j, i):
+		ct, cy, cx = self.chunk
+		out = np.empty(self.frames, dtype=self.dtype)
+		for tc in range(0, (self.frames + ct - 1)//ct):
+			out[tc*ct:(tc+1)*ct] = self.read_chunk(tc, j//cy, i//cx)[:, j % cy, i % cx]
+		return decode_frame(out, self.qscale, self.qoffset)
+
+#######################################################################################################
+#end of result classes
+
 #Simulation functions
 ################################################################################################################
 
+#FTCS update of rows j0..j1-1 and columns i0..i1-1 of ng from g
+#j is the outer loop so memory is read row by row (C order)
+#Row views start one cell left of the block so the inner index starts at 1,
+#which lets numba drop the negative index checks and vectorize the loop
+@jit(nopython=True, cache=True)
+def ftcs_block(g, ng, alph, j0, j1, i0, i1):
+	for j in range(j0, j1):
+		up = g[j-1, i0-1:i1+1]
+		row = g[j, i0-1:i1+1]
+		down = g[j+1, i0-1:i1+1]
+		a = alph[j, i0-1:i1+1]
+		out = ng[j, i0-1:i1+1]
+		for i in range(1, i1-i0+1):
+			out[i] = row[i] + (a[i])*(down[i] + up[i] + row[i+1]+row[i-1] - 4*row[i])
+
+
+#One FTCS step over every interior cell
+#tile = 0 streams whole rows, tile > 0 sweeps the grid in column strips
+#tile cells wide so the three rows the stencil reads stay in cache on very wide grids
+@jit(nopython=True, cache=True)
+def ftcs_sweep(g, ng, alph, tile):
+	l = len(g[0])
+	if tile <= 0:
+		ftcs_block(g, ng, alph, 1, l-1, 1, l-1)
+	else:
+		for i0 in range(1, l-1, tile):
+			ftcs_block(g, ng, alph, 1, l-1, i0, min(i0+tile, l-1))
+
+
+#Parallel FTCS step, rows only read the previous step so they are split between threads
+@jit(nopython=True, parallel=True, cache=True)
+def ftcs_sweep_par(g, ng, alph):
+	l = len(g[0])
+	for j in prange(1, l-1):
+		ftcs_block(g, ng, alph, j, j+1, 1, l-1)
+
+
+#Advance g by nsteps FTCS steps with temporal blocking and write the result into ng
+#The grid is cut into bands of rows. Each band plus nsteps halo rows on both sides
+#is stepped nsteps times, the first step reads g, the middle steps ping-pong
+#between the small buffers a and b while they stay in cache, and the last step
+#writes the band into ng. The correct region shrinks by one row per step on sides
+#that are not the constant edges. a and b need band+2*nsteps rows.
+@jit(nopython=True, cache=True)
+def ftcs_tblock(g, ng, alph, nsteps, band, a, b):
+	l = len(g[0])
+	for j0 in range(1, l-1, band):
+		j1 = min(j0+band, l-1)
+		lo = max(j0-nsteps, 0)
+		hi = min(j1+nsteps, l)
+		n = hi-lo
+		cur = g[lo:hi]
+		al = alph[lo:hi]
+		
+		#constant edge cells the buffers are read at but never written
+		for r in range(n):
+			a[r,0] = cur[r,0]
+			b[r,0] = cur[r,0]
+			a[r,l-1] = cur[r,l-1]
+			b[r,l-1] = cur[r,l-1]
+		for r in (0, n-1):
+			if (r == 0 and lo == 0) or (r == n-1 and hi == l):
+				for i in range(l):
+					a[r,i] = cur[r,i]
+					b[r,i] = cur[r,i]
+		
+		for s in range(1, nsteps):
+			nxt = a if s % 2 else b
+			r0 = 1 if lo == 0 else s
+			r1 = n-1 if hi == l else n-s
+			ftcs_block(cur, nxt, al, r0, r1, 1, l-1)
+			cur = nxt
+		ftcs_block(cur, ng[lo:hi], al, j0-lo, j1-lo, 1, l-1)
+
+
+#Rows per temporal block so the two band buffers and alph fit in about 1 MB of cache
+#At least 8*tblock rows so the recomputed halo rows cost less than 25% extra work
+def tblock_band(grid, tblock):
+	rows = (1 << 20) // (3*8*grid)
+	return max(rows - 2*tblock, 8*tblock)
+
+
+#Advance g by nsteps steps, returns (grid with the last step, spare grid)
+#Uses two preallocated grids (ping-pong buffers) that swap roles every step
+#Only interior cells are written, the constant edges are set once in both buffers
+@jit(nopython=True, cache=True)
+def heat_advance(g, ng, alph, nsteps, tile):
+	for t in range(nsteps):
+		ftcs_sweep(g, ng, alph, tile)
+		
+		#swap buffers, ng now holds the previous step and is overwritten next step
+		g, ng = ng, g
+	return g, ng
+
+
+#Same as heat_advance with each step split across threads
+@jit(nopython=True, cache=True)
+def heat_advance_par(g, ng, alph, nsteps):
+	for t in range(nsteps):
+		ftcs_sweep_par(g, ng, alph)
+		g, ng = ng, g
+	return g, ng
+
+
+#Same as heat_advance with up to tblock steps per pass over memory
+#a and b are the band buffers for ftcs_tblock
+@jit(nopython=True, cache=True)
+def heat_advance_tb(g, ng, alph, nsteps, tblock, band, a, b):
+	done = 0
+	while done < nsteps:
+		n = min(tblock, nsteps - done)
+		ftcs_tblock(g, ng, alph, n, band, a, b)
+		g, ng = ng, g
+		done += n
+	return g, ng
+
+
+#Whether any cell of rows j0..j1-1 and columns i0..i1-1 differs between g and ng
+#stops at the first difference, so blocks that did change cost little to check
+@jit(nopython=True, cache=True)
+def block_changed(g, ng, j0, j1, i0, i1):
+	for j in range(j0, j1):
+		for i in range(i0, i1):
+			if ng[j,i] != g[j,i]:
+				return True
+	return False
+
+
+#FTCS update of the tiles of row of tiles ty that need it, setting cur[ty] to whether
+#each tile changed. Runs of neighbouring tiles that need updating are swept as one
+#ftcs_block, so a fully active row of tiles costs the same as the plain sweep
+@jit(nopython=True, cache=True)
+def active_band(g, ng, alph, tile, prev, cur, ty):
+	l = len(g[0])
+	nty, ntx = prev.shape
+	need = np.empty(ntx, dtype=np.bool_)
+	updated = 0
+	for tx in range(ntx):
+		need[tx] = prev[ty,tx] or (ty > 0 and prev[ty-1,tx]) or (ty < nty-1 and prev[ty+1,tx]) or (tx > 0 and prev[ty,tx-1]) or (tx < ntx-1 and prev[ty,tx+1])
+		cur[ty,tx] = False
+		if need[tx]:
+			updated += 1
+	if updated == 0:
+		return 0
+	
+	j0 = 1 + ty*tile
+	j1 = min(j0+tile, l-1)
+	tx = 0
+	while tx < ntx:
+		if not need[tx]:
+			tx += 1
+			continue
+		t1 = tx
+		while t1 < ntx and need[t1]:
+			t1 += 1
+		ftcs_block(g, ng, alph, j0, j1, 1 + tx*tile, min(1 + t1*tile, l-1))
+		for t in range(tx, t1):
+			cur[ty,t] = block_changed(g, ng, j0, j1, 1 + t*tile, min(1 + (t+1)*tile, l-1))
+		tx = t1
+	return updated
+
+
+#One FTCS step that skips tiles which cannot change
+#The interior is cut into tile x tile tiles, prev[ty,tx] says whether tile (ty,tx)
+#changed in the previous step and cur is set for this step. A tile's new cells only
+#depend on the tile and the edge cells of its four neighbours, so if none of the five
+#changed last step its new cells equal its current ones. ng still holds the previous
+#step, which is then the same as the current one, so the tile is left as it is and
+#the output is identical to a full sweep. Returns the number of tiles updated
+@jit(nopython=True, cache=True)
+def active_sweep(g, ng, alph, tile, prev, cur):
+	updated = 0
+	for ty in range(prev.shape[0]):
+		updated += active_band(g, ng, alph, tile, prev, cur, ty)
+	return updated
+
+
+#Same as active_sweep with the rows of tiles split between threads
+@jit(nopython=True, parallel=True, cache=True)
+def active_sweep_par(g, ng, alph, tile, prev, cur):
+	counts = np.zeros(prev.shape[0], dtype=np.int64)
+	for ty in prange(prev.shape[0]):
+		counts[ty] = active_band(g, ng, alph, tile, prev, cur, ty)
+	return counts.sum()
+
+
+#Advance g by nsteps steps skipping quiescent tiles, returns (grid with the last step,
+#spare grid, tiles updated). flags[0] holds which tiles changed in the step before g
+#and is kept up to date, start a run with all True so the first step updates every tile.
+#Both buffers always hold whole steps, so ng is the previous step as for heat_advance
+@jit(nopython=True, cache=True)
+def heat_advance_active(g, ng, alph, nsteps, tile, flags, par):
+	updated = 0
+	for t in range(nsteps):
+		if par:
+			updated += active_sweep_par(g, ng, alph, tile, flags[0], flags[1])
+		else:
+			updated += active_sweep(g, ng, alph, tile, flags[0], flags[1])
+		flags[0,:,:] = flags[1]
+		g, ng = ng, g
+	return g, ng, updated
+
+
+#Block structured adaptive mesh refinement (AMR) kernels, see amr_grid
+#tf/nf are the fine grid (spacing dx) and tc/nc the coarse grid (spacing 2 dx), each
+#with a spare buffer. refined[by,bx] says whether block (by,bx) of bs x bs fine cells
+#is solved on the fine grid, otherwise on its (bs/2)^2 coarse cells.
+#
+#The FTCS update T += alph*sum(T_nb - T) is a finite volume scheme: each term is the
+#heat through one face (conductivity 1, area/distance 1) and alph = tp*dt/dx**2
+#divides it by the cell's heat capacity, so T/alph*dx**2 is conserved. A coarse cell
+#next to a refined block meets two fine cells on that face, the heat through each
+#half face is (ghost - T_fine)/1.5 with the centers 1.5 fine cells apart and the
+#ghost the coarse temperature interpolated to the fine cell's row or column. The
+#fine cell gains exactly what the coarse cell loses, so the scheme stays conservative.
+#The sweeps use the plain stencil everywhere and then swap the term of each face
+#between the levels for its face flux.
+
+#Coarse temperature next to fine cell (j,i) across its face with fine cell (jn,in_)
+#of a coarse block, interpolated along the face to the fine cell's row or column
+#Inlined, as a separate call it costs several times the update itself
+@jit(nopython=True, cache=True, inline='always')
+def amr_ghost(tc, j, i, jn, in_):
+	J = jn // 2
+	I = in_ // 2
+	if jn == j:
+		d = (tc[J+1,I] - tc[J-1,I]) / 8
+		return tc[J,I] - d if j % 2 == 0 else tc[J,I] + d
+	d = (tc[J,I+1] - tc[J,I-1]) / 8
+	return tc[J,I] - d if i % 2 == 0 else tc[J,I] + d
+
+
+#Set coarse cells J0..J1-1, I0..I1-1 of nc to the mean of their four fine cells in nf
+@jit(nopython=True, cache=True)
+def amr_restrict(nf, nc, J0, J1, I0, I1):
+	for J in range(J0, J1):
+		top = nf[2*J, 2*I0:2*I1]
+		bottom = nf[2*J+1, 2*I0:2*I1]
+		out = nc[J, I0:I1]
+		for I in range(I1-I0):
+			out[I] = 0.25*(top[2*I] + top[2*I+1] + bottom[2*I] + bottom[2*I+1])
+
+
+#One conservative FTCS step of the composite grid, writes nf on refined blocks and nc
+#on coarse ones, and nc under the sides of refined blocks next to coarse blocks to
+#the mean of their fine cells. Returns the number of cells updated. Runs of
+#neighbouring blocks of one level in a row of blocks get the plain stencil as one
+#ftcs_block (like active_band), then the cells along sides facing the other level
+#are corrected. Blocks on the grid edges are always refined so coarse cells never
+#touch the constant edges
+@jit(nopython=True, cache=True)
+def amr_step(tf, nf, tc, nc, af, ac, refined, bs):
+	N = tf.shape[0]
+	cb = bs // 2
+	nb = refined.shape[0]
+	updated = 0
+	for by in range(nb):
+		j0 = max(by*bs, 1)
+		j1 = min((by+1)*bs, N-1)
+		bx = 0
+		while bx < nb:
+			fine = refined[by,bx]
+			b1 = bx
+			while b1 < nb and refined[by,b1] == fine:
+				b1 += 1
+			if fine:
+				i0 = max(bx*bs, 1)
+				i1 = min(b1*bs, N-1)
+				ftcs_block(tf, nf, af, j0, j1, i0, i1)
+				updated += (j1-j0)*(i1-i0)
+			else:
+				ftcs_block(tc, nc, ac, by*cb, (by+1)*cb, bx*cb, b1*cb)
+				updated += cb*cb*(b1-bx)
+			bx = b1
+
+		#side k of a block is north, south, west, east, its cells are rows r0..r1-1 and
+		#columns c0..c1-1 and their neighbours across it are (dy,dx) away, in block
+		#(by+dy,bx+dx). Where that is on the other level, the stencil term of that face
+		#is swapped for the face flux
+		for bx in range(nb):
+			fine = refined[by,bx]
+			if fine:
+				y0, y1 = j0, j1
+				x0 = max(bx*bs, 1)
+				x1 = min((bx+1)*bs, N-1)
+			else:
+				y0, y1 = by*cb, (by+1)*cb
+				x0, x1 = bx*cb, (bx+1)*cb
+			for k in range(4):
+				dy = -1 if k == 0 else 1 if k == 1 else 0
+				dx = -1 if k == 2 else 1 if k == 3 else 0
+				if by+dy < 0 or by+dy >= nb or bx+dx < 0 or bx+dx >= nb or refined[by+dy,bx+dx] == fine:
+					continue
+				r0 = y1-1 if k == 1 else y0
+				r1 = y0+1 if k == 0 else y1
+				c0 = x1-1 if k == 3 else x0
+				c1 = x0+1 if k == 2 else x1
+				if fine:
+					for j in range(r0, r1):
+						for i in range(c0, c1):
+							t = tf[j,i]
+							nf[j,i] += af[j,i]*((amr_ghost(tc, j, i, j+dy, i+dx) - t) / 1.5 - (tf[j+dy,i+dx] - t))
+				else:
+					#the two fine cells across the face of coarse cell (J,I) are
+					#(2J+oy0, 2I+ox0) and (2J+oy1, 2I+ox1)
+					oy0 = -1 if dy < 0 else 2 if dy > 0 else 0
+					ox0 = -1 if dx < 0 else 2 if dx > 0 else 0
+					oy1 = oy0 if dy != 0 else 1
+					ox1 = ox0 if dx != 0 else 1
+					for J in range(r0, r1):
+						for I in range(c0, c1):
+							jf0, if0 = 2*J + oy0, 2*I + ox0
+							jf1, if1 = 2*J + oy1, 2*I + ox1
+							q = ((tf[jf0,if0] - amr_ghost(tc, jf0, if0, jf0-dy, if0-dx)) / 1.5
+								+ (tf[jf1,if1] - amr_ghost(tc, jf1, if1, jf1-dy, if1-dx)) / 1.5)
+							nc[J,I] += ac[J,I]*(q - (tc[J+dy,I+dx] - tc[J,I]))
+
+			#the coarse cells of a refined block are only read next to coarse blocks,
+			#so only those are averaged down each step (all of them in amr_average)
+			if fine:
+				for k in range(4):
+					dy = -1 if k == 0 else 1 if k == 1 else 0
+					dx = -1 if k == 2 else 1 if k == 3 else 0
+					if by+dy < 0 or by+dy >= nb or bx+dx < 0 or bx+dx >= nb or refined[by+dy,bx+dx]:
+						continue
+					r0 = (by+1)*cb-1 if k == 1 else by*cb
+					r1 = by*cb+1 if k == 0 else (by+1)*cb
+					c0 = (bx+1)*cb-1 if k == 3 else bx*cb
+					c1 = bx*cb+1 if k == 2 else (bx+1)*cb
+					for J in range(r0, r1):
+						for I in range(c0, c1):
+							nc[J,I] = 0.25*(nf[2*J,2*I] + nf[2*J+1,2*I] + nf[2*J,2*I+1] + nf[2*J+1,2*I+1])
+	return updated
+
+
+#Set the coarse cells of every refined block to the mean of their fine cells
+#The edge rows and columns of the fine grid never change, they average in as they are
+@jit(nopython=True, cache=True)
+def amr_average(tf, tc, refined, bs):
+	cb = bs // 2
+	nb = refined.shape[0]
+	for by in range(nb):
+		bx = 0
+		while bx < nb:
+			b1 = bx
+			while b1 < nb and refined[by,b1]:
+				b1 += 1
+			if b1 > bx:
+				amr_restrict(tf, tc, by*cb, (by+1)*cb, bx*cb, b1*cb)
+				bx = b1
+			else:
+				bx += 1
+
+
+#nsteps amr_step steps with ping-pong buffers, returns (tf, nf, tc, nc, cells updated)
+@jit(nopython=True, cache=True)
+def amr_advance(tf, nf, tc, nc, af, ac, refined, bs, nsteps):
+	updated = 0
+	for t in range(nsteps):
+		updated += amr_step(tf, nf, tc, nc, af, ac, refined, bs)
+		tf, nf = nf, tf
+		tc, nc = nc, tc
+	return tf, nf, tc, nc, updated
+
+
+#Slope of the minmod limiter, 0 at extrema so interpolation makes no new ones
+@jit(nopython=True, cache=True)
+def minmod(a, b):
+	if a*b <= 0:
+		return 0.0
+	return a if abs(a) < abs(b) else b
+
+
+#Fill the fine cells of block (by,bx) of out from the coarse cells with limited linear
+#interpolation, the four fine cells of a coarse cell average to its temperature
+@jit(nopython=True, cache=True)
+def amr_prolong(tc, out, bs, by, bx):
+	cb = bs // 2
+	for J in range(by*cb, (by+1)*cb):
+		for I in range(bx*cb, (bx+1)*cb):
+			t = tc[J,I]
+			sx = minmod(tc[J,I+1] - t, t - tc[J,I-1]) / 4
+			sy = minmod(tc[J+1,I] - t, t - tc[J-1,I]) / 4
+			out[2*J,2*I] = t - sy - sx
+			out[2*J,2*I+1] = t - sy + sx
+			out[2*J+1,2*I] = t + sy - sx
+			out[2*J+1,2*I+1] = t + sy + sx
+
+
+#Blocks to refine: forced ones, blocks where neighbouring coarse cells differ by more
+#than tol, and the blocks around those so fronts stay refined until the next regrid
+@jit(nopython=True, cache=True)
+def amr_flags(tc, bs, tol, forced):
+	n = tc.shape[0]
+	nb = forced.shape[0]
+	block = np.arange(n) // (bs // 2)
+	steep = np.zeros((nb, nb), dtype=np.bool_)
+	for J in range(n-1):
+		by = block[J]
+		for I in range(n-1):
+			if abs(tc[J,I+1] - tc[J,I]) > tol:
+				steep[by,block[I]] = True
+				steep[by,block[I+1]] = True
+			if abs(tc[J+1,I] - tc[J,I]) > tol:
+				steep[by,block[I]] = True
+				steep[block[J+1],block[I]] = True
+	flags = forced.copy()
+	for by in range(nb):
+		for bx in range(nb):
+			if steep[by,bx]:
+				for y in range(max(by-1, 0), min(by+2, nb)):
+					for x in range(max(bx-1, 0), min(bx+2, nb)):
+						flags[y,x] = True
+	return flags
+
+
+#Fine grid of the composite solution: fine cells of refined blocks, interpolated coarse cells elsewhere
+@jit(nopython=True, cache=True)
+def amr_composite(tf, tc, refined, bs, out):
+	nb = refined.shape[0]
+	for by in range(nb):
+		for bx in range(nb):
+			if refined[by,bx]:
+				out[by*bs:(by+1)*bs, bx*bs:(bx+1)*bs] = tf[by*bs:(by+1)*bs, bx*bs:(bx+1)*bs]
+			else:
+				amr_prolong(tc, out, bs, by, bx)
+
+
+#Largest change of any cell between grids g and ng
+@jit(nopython=True, cache=True)
+def max_change(g, ng):
+	m = 0.0
+	for j in range(g.shape[0]):
+		for i in range(g.shape[1]):
+			d = abs(g[j,i] - ng[j,i])
+			if d > m:
+				m = d
+	return m
+
+
+#Columns of the per frame statistics from frame_stats()
+#ob_mean, ob_min, ob_max: object temperature (K) over every is_ob cell
+#ob_heat: sum of the object temperatures times the cell area (K m^2), the object's
+#         heat content divided by its density, heat capacity and thickness
+#bk_mean: mean temperature of the interior cells outside the object (K)
+#flux:    heat flowing in through the four constant edges (K m^2/s, same units)
+stat_names = ['ob_mean', 'ob_min', 'ob_max', 'ob_heat', 'bk_mean', 'flux']
+
+
+#Count, sum, min and max of the cells of g covered by spans (from mask_spans)
+#costs O(cells in the spans), not O(grid**2)
+@jit(nopython=True, cache=True)
+def span_stats(g, spans):
+	n = 0
+	total = 0.0
+	lo = np.inf
+	hi = -np.inf
+	for k in range(len(spans)):
+		row = g[spans[k,0]]
+		for i in range(spans[k,1], spans[k,2]):
+			t = row[i]
+			total += t
+			lo = min(lo, t)
+			hi = max(hi, t)
+		n += spans[k,2] - spans[k,1]
+	return n, total, lo, hi
+
+
+#Set the cells of g covered by spans to value, like g[mask] = value
+@jit(nopython=True, cache=True)
+def fill_spans(g, spans, value):
+	for k in range(len(spans)):
+		row = g[spans[k,0]]
+		for i in range(spans[k,1], spans[k,2]):
+			row[i] = value
+
+
+#Row spans of the interior cells (not on the edges of an h x w grid) outside spans
+#In row major order like mask_spans() of the complement of the mask inside the edges
+@jit(nopython=True, cache=True)
+def span_gaps(spans, h, w):
+	out = np.empty((len(spans) + h, 3), dtype=np.int64)
+	n = 0
+	k = 0
+	for r in range(1, h-1):
+		while k < len(spans) and spans[k,0] < r:
+			k += 1
+		c = 1
+		while k < len(spans) and spans[k,0] == r:
+			end = min(spans[k,1], w-1)
+			if end > c:
+				out[n,0] = r
+				out[n,1] = c
+				out[n,2] = end
+				n += 1
+			c = max(c, spans[k,2])
+			k += 1
+		if c < w-1:
+			out[n,0] = r
+			out[n,1] = c
+			out[n,2] = w-1
+			n += 1
+	return out[:n]
+
+
+#Row spans of a mask packed by rows with np.packbits (see packed_mask), written into
+#out and returned as their number. With out too short nothing is written, so one call
+#with an empty out counts the spans and a second fills an out of that length.
+#Bytes that are all 0 outside a span or all 1 inside one are skipped whole.
+@jit(nopython=True, cache=True)
+def packed_spans(bits, w, out):
+	fill = len(out) > 0
+	n = 0
+	for r in range(bits.shape[0]):
+		inside = False
+		start = 0
+		for b in range(bits.shape[1]):
+			byte = bits[r,b]
+			if (byte == 0 and not inside) or (byte == 255 and inside):
+				continue
+			for t in range(8):
+				c = 8*b + t
+				if c >= w:
+					break
+				bit = (byte >> (7 - t)) & 1
+				if bit and not inside:
+					inside = True
+					start = c
+				elif not bit and inside:
+					inside = False
+					if fill:
+						out[n,0] = r
+						out[n,1] = start
+						out[n,2] = c
+					n += 1
+		if inside:
+			if fill:
+				out[n,0] = r
+				out[n,1] = start
+				out[n,2] = w
+			n += 1
+	return n
+
+
+#Values of the cells of g covered by spans, in row major order like g[mask]
+@jit(nopython=True, cache=True)
+def span_values(g, spans):
+	n = 0
+	for k in range(len(spans)):
+		n += spans[k,2] - spans[k,1]
+	out = np.empty(n, dtype=g.dtype)
+	n = 0
+	for k in range(len(spans)):
+		row = g[spans[k,0]]
+		for i in range(spans[k,1], spans[k,2]):
+			out[n] = row[i]
+			n += 1
+	return out
+
+
+#Statistics of frame g, written to out in the order of stat_names
+#ob_spans and bk_spans are heat_system.ob_spans and bk_spans, so only object and
+#background cells are visited, without a branch on is_ob per cell
+#ob_heat and flux are left in cell units, sum of temperatures and
+#sum of alph*(edge - cell) per step; heat_system.scale_stats() converts them
+#Object values are nan without an object, bk_mean without background
+@jit(nopython=True, cache=True)
+def frame_stats(g, ob_spans, bk_spans, alph, out):
+	n = g.shape[0]
+	m = g.shape[1]
+	ob_n, ob_sum, ob_min, ob_max = span_stats(g, ob_spans)
+	bk_n, bk_sum, bk_min, bk_max = span_stats(g, bk_spans)
+	
+	#exchange between each edge cell and the interior cell next to it
+	flux = 0.0
+	for i in range(1, m-1):
+		flux += alph[1][i]*(g[0][i] - g[1][i]) + alph[n-2][i]*(g[n-1][i] - g[n-2][i])
+	for j in range(1, n-1):
+		flux += alph[j][1]*(g[j][0] - g[j][1]) + alph[j][m-2]*(g[j][m-1] - g[j][m-2])
+	
+	if ob_n > 0:
+		out[0] = ob_sum/ob_n
+		out[1] = ob_min
+		out[2] = ob_max
+	else:
+		out[0] = np.nan
+		out[1] = np.nan
+		out[2] = np.nan
+	out[3] = ob_sum
+	out[4] = bk_sum/bk_n if bk_n > 0 else np.nan
+	out[5] = flux
+
+
 #Calculate all frames of simulation
-@jit(nopython=True)
-def heat_jump(gtot, dt , dx , bk_tp, runtime, rate, ob_tp, is_ob):
+#alph is the per cell diffusivity field from heat_system.get_alph()
+#With tol > 0 the run stops at the first saved frame where the largest change
+#of the last step is below tol, and gtot is returned trimmed to the frames produced
+#With a stats array (frames x len(stat_names)) and the object and background spans,
+#frame_stats() fills one row per frame while the frame is still in cache
+@jit(nopython=True, cache=True)
+def heat_jump(gtot, alph, runtime, rate, tile=0, tol=0.0, stats=None, ob_spans=None, bk_spans=None):
+	g = gtot[0].copy()
+	ng = g.copy()
+	if stats is not None:
+		frame_stats(g, ob_spans, bk_spans, alph, stats[0])
+	for f in range(1, runtime//rate):
+		g, ng = heat_advance(g, ng, alph, rate, tile)
+		gtot[f] = g
+		if stats is not None:
+			frame_stats(g, ob_spans, bk_spans, alph, stats[f])
+		if tol > 0 and max_change(g, ng) < tol:
+			return gtot[:f+1]
+	return gtot
+
+
+#Calculate all frames of simulation on multiple cores
+#Same as heat_jump with each step split across threads, gives identical frames
+@jit(nopython=True, cache=True)
+def heat_jump_par(gtot, alph, runtime, rate, tol=0.0, stats=None, ob_spans=None, bk_spans=None):
 	g = gtot[0].copy()
+	ng = g.copy()
+	if stats is not None:
+		frame_stats(g, ob_spans, bk_spans, alph, stats[0])
+	for f in range(1, runtime//rate):
+		g, ng = heat_advance_par(g, ng, alph, rate)
+		gtot[f] = g
+		if stats is not None:
+			frame_stats(g, ob_spans, bk_spans, alph, stats[f])
+		if tol > 0 and max_change(g, ng) < tol:
+			return gtot[:f+1]
+	return gtot
+
+
+#Calculate all frames of simulation with temporal blocking
+#Runs up to tblock steps per pass over memory, never past a saved frame
+#Gives identical frames to heat_jump
+#The change checked against tol is averaged over the steps of the last pass
+@jit(nopython=True, cache=True)
+def heat_jump_tb(gtot, alph, runtime, rate, tblock, band, tol=0.0, stats=None, ob_spans=None, bk_spans=None):
+	g = gtot[0].copy()
+	ng = g.copy()
 	l = len(g[0])
-	t=0
-	f=0
-	bk_alph = (bk_tp*dt)/dx**2
-	ob_alph = (ob_tp*dt)/dx**2
-	for t in range(1,runtime):
-		ng = g.copy()
-		for i in range(1 ,l-1):
-			for j in range(1,l-1):
-				if is_ob[j][i]:
-					ng[j][i] = g[j][i] + (ob_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
-					pass
-				else:
-					ng[j][i] = g[j][i] + (bk_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
-					
-		g = ng.copy()
-		if t % rate ==0:
-			f+=1
-			gtot[f] = g
-		
+	a = np.empty((band + 2*tblock, l), dtype=g.dtype)
+	b = np.empty((band + 2*tblock, l), dtype=g.dtype)
+	last = rate % tblock if rate % tblock else tblock
+	if stats is not None:
+		frame_stats(g, ob_spans, bk_spans, alph, stats[0])
+	for f in range(1, runtime//rate):
+		g, ng = heat_advance_tb(g, ng, alph, rate, tblock, band, a, b)
+		gtot[f] = g
+		if stats is not None:
+			frame_stats(g, ob_spans, bk_spans, alph, stats[f])
+		if tol > 0 and max_change(g, ng)/last < tol:
+			return gtot[:f+1]
 	return gtot
 
 
 #Calculate next frame of simulation
-@jit(nopython=True)
-def heat_step(g, dt , dx , bk_tp, ob_tp, is_ob):
-	l = len(g[0])
+@jit(nopython=True, cache=True)
+def heat_step(g, alph, tile=0):
 	ng = g.copy()
-	bk_alph = (bk_tp*dt)/dx**2
-	ob_alph = (ob_tp*dt)/dx**2
-	for i in range(1 ,l-1):
-		for j in range(1,l-1):
-			if is_ob[j][i]:
-				ng[j][i] = g[j][i] + (ob_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
-			else:
-				ng[j][i] = g[j][i] + (bk_alph)*(g[j+1][i] + g[j-1][i] + g[j][i+1]+g[j][i-1] - 4*g[j][i])
-	g = ng.copy()
-	return g
+	ftcs_sweep(g, ng, alph, tile)
+	return ng
+
+
+#Calculate next frame of simulation on multiple cores
+@jit(nopython=True, cache=True)
+def heat_step_par(g, alph):
+	ng = g.copy()
+	ftcs_sweep_par(g, ng, alph)
+	return ng
+
+
+#Batches of independent scenarios (same grid size, different diffusivities and temperatures)
+#are stored as stacks of shape (blocks, grid, grid, width): scenario b is
+#stack[b // width, :, :, b % width]. The scenario index is the last (fastest) axis so
+#the kernel's inner loop runs over width scenarios at once and vectorizes even on
+#small grids, and each block is contiguous and small enough to stay in cache while
+#it is stepped. The last block is padded with zero scenarios that never change.
+
+#FTCS step of one block of shape (grid, grid, width), alph is the block's diffusivities
+#Each row flattened is one contiguous line of grid*width cells where the left and
+#right neighbours are width cells away
+@jit(nopython=True, cache=True)
+def ftcs_batch(g, ng, alph):
+	l, m, nb = g.shape
+	g2 = g.reshape(l, m*nb)
+	ng2 = ng.reshape(l, m*nb)
+	a2 = alph.reshape(l, m*nb)
+	n = (m-2)*nb
+	for j in range(1, l-1):
+		#views starting at the first interior cell, so every index below is k
+		up = g2[j-1, nb:]
+		row = g2[j, nb:]
+		down = g2[j+1, nb:]
+		left = g2[j]
+		right = g2[j, 2*nb:]
+		a = a2[j, nb:]
+		out = ng2[j, nb:]
+		for k in range(n):
+			out[k] = row[k] + a[k]*(down[k] + up[k] + right[k] + left[k] - 4*row[k])
+
+
+#One FTCS step of a stack, same as heat_step on every scenario
+@jit(nopython=True, cache=True)
+def heat_step_batch(g, alph):
+	ng = g.copy()
+	for k in range(g.shape[0]):
+		ftcs_batch(g[k], ng[k], alph[k])
+	return ng
+
+
+#Advance a stack by nsteps steps, returns (stack with the last step, spare stack)
+#Each block takes all nsteps steps with ping-pong buffers before the next block is
+#read, so a block is loaded from memory once per call instead of once per step
+@jit(nopython=True, cache=True)
+def heat_advance_batch(g, ng, alph, nsteps):
+	for k in range(g.shape[0]):
+		a = g[k]
+		b = ng[k]
+		for t in range(nsteps):
+			ftcs_batch(a, b, alph[k])
+			a, b = b, a
+	if nsteps % 2:
+		return ng, g
+	return g, ng
+
+
+#Scenarios per block so a block's two buffers and alph fit in about 1 MB of cache
+def batch_width(grid):
+	return max((1 << 20) // (3*8*grid*grid), 1)
+
+
+#Stack the start grids and diffusivities of FTCS heat_systems with the same grid
+#size, dt, rate and runtime, returns (stack, alph stack) for heat_advance_batch
+#width defaults to batch_width(), never more than the number of systems
+def batch_stack(systems, width=None):
+	first = systems[0]
+	for heat_sys in systems:
+		if (heat_sys.grid, heat_sys.dt, heat_sys.rate, heat_sys.runtime) != (first.grid, first.dt, first.rate, first.runtime):
+			raise ValueError('Batched systems need the same grid, dt, rate and runtime')
+	if width is None:
+		width = min(batch_width(first.grid), len(systems))
+	blocks = (len(systems) + width - 1) // width
+	g = np.zeros((blocks, first.grid, first.grid, width), dtype=first.dtype)
+	alph = np.zeros(g.shape, dtype=first.dtype)
+	for b, heat_sys in enumerate(systems):
+		g[b // width, :, :, b % width] = heat_sys.init_grid()
+		alph[b // width, :, :, b % width] = heat_sys.alph
+	return g, alph
+
+
+#Grid of scenario b in a stack from batch_stack
+def batch_grid(g, b):
+	return g[b // g.shape[3], :, :, b % g.shape[3]]
+
+
+#Run FTCS heat_systems together as one stack, yields (frame index, stack) like
+#heat_system.frames(), frame f of system b is batch_grid(stack, b)
+#The stack is overwritten by the next frame, copy what has to be kept
+def batch_frames(systems):
+	g, alph = batch_stack(systems)
+	ng = g.copy()
+	steps = systems[0].frame_steps()
+	yield 0, g
+	for f in range(1, systems[0].runtime // systems[0].rate):
+		g, ng = heat_advance_batch(g, ng, alph, steps)
+		yield f, g
+
+
+#Gauss-Seidel sweeps on a CSR matrix (indptr, indices, data), updating x in place for A x = b
+#Rows are visited in reverse when backward is set, so a forward pre-smooth and a
+#backward post-smooth keep a multigrid cycle symmetric
+@jit(nopython=True, cache=True)
+def gauss_seidel(indptr, indices, data, x, b, sweeps, backward):
+	n = len(x)
+	for s in range(sweeps):
+		for k in range(n):
+			r = n - 1 - k if backward else k
+			diag = 0.0
+			acc = b[r]
+			for p in range(indptr[r], indptr[r+1]):
+				c = indices[p]
+				if c == r:
+					diag = data[p]
+				else:
+					acc -= data[p]*x[c]
+			x[r] = acc/diag
+
+
+#Factor the tridiagonal line systems of the ADI half steps, done once as alph is fixed
+#Along a line of interior cells the equations are -r x[k-1] + (1+2r) x[k] - r x[k+1] = d[k]
+#with r = alph/2 of the cell. cx, px are the eliminated super diagonal and inverse pivots
+#of the Thomas algorithm along rows, cy, py along columns
+@jit(nopython=True, cache=True)
+def adi_factor(alph):
+	n = alph.shape[0]
+	cx = np.zeros_like(alph)
+	px = np.zeros_like(alph)
+	cy = np.zeros_like(alph)
+	py = np.zeros_like(alph)
+	for j in range(1, n-1):
+		for i in range(1, n-1):
+			r = 0.5*alph[j][i]
+			px[j][i] = 1.0/(1.0 + 2.0*r + r*cx[j][i-1])
+			cx[j][i] = -r*px[j][i]
+			py[j][i] = 1.0/(1.0 + 2.0*r + r*cy[j-1][i])
+			cy[j][i] = -r*py[j][i]
+	return cx, px, cy, py
+
+
+#One Peaceman-Rachford ADI step from g into ng with the factors from adi_factor
+#h is the half step grid, its edges and those of ng must already hold the edge values
+#The row pass solves each row on its own, the column pass runs the Thomas algorithm
+#down all columns at once so it still walks memory row by row
+@jit(nopython=True, cache=True)
+def adi_step(g, ng, alph, h, cx, px, cy, py):
+	n = g.shape[0]
+	#implicit along rows, explicit along columns
+	for j in range(1, n-1):
+		up = g[j-1]
+		row = g[j]
+		down = g[j+1]
+		a = alph[j]
+		out = h[j]
+		p = px[j]
+		c = cx[j]
+		d = row[0]
+		for i in range(1, n-1):
+			r = 0.5*a[i]
+			d = (row[i] + r*(up[i] + down[i] - 2*row[i]) + r*d)*p[i]
+			out[i] = d
+		out[n-2] += 0.5*a[n-2]*row[n-1]*p[n-2]
+		for i in range(n-3, 0, -1):
+			out[i] -= c[i]*out[i+1]
+	
+	#implicit along columns, explicit along rows
+	for j in range(1, n-1):
+		up = ng[j-1]
+		row = h[j]
+		a = alph[j]
+		out = ng[j]
+		p = py[j]
+		for i in range(1, n-1):
+			r = 0.5*a[i]
+			out[i] = (row[i] + r*(row[i-1] + row[i+1] - 2*row[i]) + r*up[i])*p[i]
+	a = alph[n-2]
+	out = ng[n-2]
+	p = py[n-2]
+	for i in range(1, n-1):
+		out[i] += 0.5*a[i]*g[n-1][i]*p[i]
+	for j in range(n-3, 0, -1):
+		c = cy[j]
+		out = ng[j]
+		down = ng[j+1]
+		for i in range(1, n-1):
+			out[i] -= c[i]*down[i]
+
+
+#Advance g by nsteps ADI steps using ng as the second buffer, returns (g, ng)
+@jit(nopython=True, cache=True)
+def heat_advance_adi(g, ng, alph, nsteps, h, cx, px, cy, py):
+	for s in range(nsteps):
+		adi_step(g, ng, alph, h, cx, px, cy, py)
+		g, ng = ng, g
+	return g, ng
 
 
 
 
 #Create surface plot and colormap of final sim state
+#gtot can be the frames or the path of an .npy frame file, which is read lazily
 def doub_plot(gtot, x_size, grid):
+	import matplotlib.pyplot as plt
+	if isinstance(gtot, str):
+		gtot = np.load(gtot, mmap_mode='r')
 	frames = len(gtot)
 	gx = np.linspace(0, x_size*100 , grid)
 	gy = np.linspace(0, x_size*100 , grid)
@@ -167,7 +1948,14 @@ def doub_plot(gtot, x_size, grid):
 
 
 # Create colormap animation of system
-def anim_plot(gtot, grid, is_ob, runtime):
+#gtot can be the frames or the path of an .npy frame file, which is read lazily
+#stats are the per frame statistics of the run (heat_system.stats), without them the
+#object mean is worked out from the frames
+def anim_plot(gtot, grid, is_ob, runtime, stats=None):
+	import matplotlib.pyplot as plt
+	import matplotlib.animation as animation
+	if isinstance(gtot, str):
+		gtot = np.load(gtot, mmap_mode='r')
 	frames=len(gtot)
 	f = plt.figure(figsize = (15,10))
 	ax1 = f.add_subplot(1,2,1)
@@ -179,13 +1967,21 @@ def anim_plot(gtot, grid, is_ob, runtime):
 	cba.set_label('Temperature (K)')
 	
 	ax2 = f.add_subplot(1,3,3)
-	ax2.plot(np.linspace(0,runtime,frames),np.array([g[is_ob].mean() for g in gtot]))
+	if stats is None:
+		spans = mask_spans(is_ob)
+		ob_mean = np.zeros(frames)
+		for i in range(frames):
+			n, total, lo, hi = span_stats(gtot[i], spans)
+			ob_mean[i] = total/n if n else np.nan
+	else:
+		ob_mean = stats[:frames, 0]
+	ax2.plot(np.linspace(0,runtime,frames),ob_mean)
 	ax2.set_xlabel('Time (s)')
 	ax2.set_ylabel('Average Object Temperature (K)')
 	ax2.set_title('Avg. Object Temperature during Simulation')
 	
 	def update(i):
-		a.set_data(gtot[i,:,:])
+		a.set_data(gtot[i])
 		return a,
 
 	ani = animation.FuncAnimation(f,update,frames=len(gtot), interval=20, blit=True)
@@ -198,6 +1994,289 @@ def anim_plot(gtot, grid, is_ob, runtime):
 #########################################################################################
 #End of simulation functions
 
+
+#Headless runs and batch parameter sweeps
+#######################################################################################################
+#A run config is a dict (a JSON or TOML file on the command line) of the settings of
+#heat_system.params() plus 'shape', the path of a shape image (no object without it).
+#Missing settings use config_defaults, dt = 'auto' picks the largest stable FTCS step.
+#
+#A sweep spec is a dict with
+#  base: settings shared by every run, a run config
+#  runs: optional list of settings, one run each
+#  grid: optional dict of setting -> list of values, every combination is run
+#Every entry of runs is combined with every combination of grid, on top of base.
+#Each run streams its frames without storing them and gives one summary row: its
+#settings, wall time, steps, frames and the statistics of its last frame.
+#Rows are appended to a CSV file as runs finish, rerunning a sweep skips the runs whose
+#run_id (a hash of the settings) is already there, so an interrupted sweep resumes.
+
+#Settings a run config does not set, the curses Default Settings
+config_defaults = {'runtime': 1000, 'rate': 100, 'grid': 100, 'top': 1, 'right': 1, 'bottom': 1, 'left': 1,
+	'bk_tp': 1e-6, 'ob_tp': 1e-6, 'bk_temp': 1, 'ob_temp': 5, 'shape': None}
+
+#Summary columns after the settings
+sweep_results = ['wall_s', 'steps', 'frames', 'sim_time', 'stopped_early'] + ['final_' + name for name in stat_names]
+
+#Shape masks of the sweep keyed by (shape, grid) as packed_mask, loaded once by the
+#parent and handed to every worker process when it starts
+sweep_masks = {}
+
+
+#List of settings dicts of every run in spec
+def sweep_runs(spec):
+	base = dict(config_defaults)
+	base.update(spec.get('base', {}))
+	grid = spec.get('grid', {})
+	keys = list(grid)
+	runs = []
+	for entry in spec.get('runs', [{}]):
+		for values in itertools.product(*[grid[k] for k in keys]):
+			p = dict(base)
+			p.update(entry)
+			p.update(zip(keys, values))
+			runs.append(p)
+	return runs
+
+
+#Stable id of a run's settings, used to skip finished runs when resuming
+def run_id(p):
+	return hashlib.sha1(json.dumps(p, sort_keys=True).encode()).hexdigest()[:12]
+
+
+#Object mask of a run, from sweep_masks when the sweep loaded it
+def sweep_mask(p):
+	key = (p['shape'], p['grid'])
+	if key not in sweep_masks:
+		sweep_masks[key] = packed_mask(load_mask(p['shape'], p['grid']))
+	return sweep_masks[key]
+
+
+#Worker process initializer, the masks are read only and shared by every run of the worker
+def sweep_worker_init(masks):
+	sweep_masks.update(masks)
+
+
+#heat_system of a run config with config_defaults filled in, with its shape mask
+def config_system(p):
+	heat_sys = system_from_params(p)
+	if p['shape']:
+		heat_sys.is_ob = sweep_mask(p)
+	if p.get('dt') == 'auto':
+		heat_sys.auto_dt()
+	return heat_sys
+
+
+#Raise ValueError if heat_sys fails the stability and frame rate tests the interface runs
+def check_system(heat_sys):
+	if not (heat_sys.tp_test(heat_sys.bk_tp) and heat_sys.tp_test(heat_sys.ob_tp)):
+		raise ValueError('Thermal diffusivity failed the stability test for dt = ' + str(heat_sys.dt))
+	if not heat_sys.rate_test():
+		raise ValueError('Frame rate must divide runtime into a whole number of dt steps')
+	if not heat_sys.store_test():
+		raise ValueError('uint16 frames need a scheme that keeps the maximum principle (ftcs or be)')
+
+
+#Compile the kernels for float64 and float32 grids ahead of the first run
+#The kernels are cached on disk (cache=True) so later processes load the machine code
+#instead of compiling it. Runs a tiny system through every solver path so each
+#kernel is compiled with the argument types real runs use. Returns the seconds taken
+def precompile(dtypes=('float64', 'float32')):
+	import importlib.util
+	start = time.perf_counter()
+	settings = [{}, {'tile': 8}, {'threads': 2}, {'tblock': 2}, {'tol': 1e-12}, {'active': 4}, {'active': 4, 'threads': 2}, {'amr': 4},
+		{'store': 'float32'}, {'scheme': 'adi'}, {'scheme': 'adi', 'adaptive': 1e-3}]
+	if importlib.util.find_spec('scipy') is not None:
+		settings += [{'scheme': 'be'}, {'scheme': 'cn'}]
+	for dtype in dtypes:
+		for extra in settings:
+			p = dict(config_defaults, runtime=4, rate=2, grid=16, dtype=dtype)
+			p.update(extra)
+			heat_sys = config_system(p)
+			heat_sys.is_ob[6:10, 6:10] = True
+			heat_sys.run(heat_sys.init_sys())
+			g = heat_sys.init_grid()
+			heat_step(g, heat_sys.alph)
+			heat_step_par(g, heat_sys.alph)
+		g, alph = batch_stack([heat_sys, heat_sys])
+		heat_advance_batch(g, g.copy(), alph, 1)
+	return time.perf_counter() - start
+
+
+#Read a run config or sweep spec, TOML for .toml files and JSON otherwise
+def load_config(path):
+	if path.endswith('.toml'):
+		import tomllib
+		with open(path, 'rb') as inp:
+			return tomllib.load(inp)
+	with open(path) as inp:
+		return json.load(inp)
+
+
+#Run one simulation from a run config without the curses interface
+#config may also hold
+#  out:  directory to save the frames to with result_writer, instead of keeping them in RAM
+#  plot: True to also make the anim_plot() animation of the run, show it with
+#        matplotlib.pyplot.show() while the returned animation is kept
+#returns a dict of
+#  params:  the settings of the run, as in heat_system.params() plus shape
+#  frames:  the saved frames, an array or a result_reader when out is given
+#  stats:   per frame statistics, one row per frame with the columns of stat_names
+#  is_ob:   the object mask
+#  steps, wall_s: time steps taken and run time in seconds
+#  animation: the animation when plot is set
+#Raises ValueError if the settings fail the tests the interface runs
+def simulate(config):
+	p = dict(config_defaults)
+	p.update(config)
+	heat_sys = config_system(p)
+	check_system(heat_sys)
+	
+	start = time.perf_counter()
+	if p.get('out'):
+		if not heat_sys.size_test():
+			raise ValueError('Not enough free disk space for the frames')
+		writer = result_writer(p['out'], heat_sys)
+		heat_sys.run_stream(heat_sys.init_grid(), writer)
+		writer.close()
+		frames = result_reader(p['out'])
+	else:
+		frames = heat_sys.run(heat_sys.init_sys())
+	wall = time.perf_counter() - start
+	
+	params = heat_sys.params()
+	params['shape'] = p['shape']
+	results = {'params': params, 'frames': frames, 'stats': heat_sys.stats, 'is_ob': np.asarray(heat_sys.is_ob),
+		'steps': heat_sys.steps_run, 'wall_s': wall}
+	if p.get('plot'):
+		results['animation'] = anim_plot(frames, heat_sys.grid, heat_sys.is_ob, heat_sys.frames_run*heat_sys.rate, heat_sys.stats)
+	return results
+
+
+#Run one sweep entry and return its summary row
+def sweep_one(p):
+	start = time.perf_counter()
+	heat_sys = config_system(p)
+	g = heat_sys.init_grid()
+	for f, frame in heat_sys.frames(g):
+		pass
+	row = dict(p)
+	row['run_id'] = run_id(p)
+	row['wall_s'] = time.perf_counter() - start
+	row['steps'] = heat_sys.steps_run
+	row['frames'] = heat_sys.frames_run
+	row['sim_time'] = (heat_sys.frames_run - 1)*heat_sys.rate
+	row['stopped_early'] = heat_sys.frames_run < heat_sys.runtime // heat_sys.rate
+	for name, value in zip(stat_names, heat_sys.stats[-1]):
+		row['final_' + name] = value
+	return row
+
+
+#Run every run of spec not yet in the CSV file out on a pool of worker processes
+#workers defaults to the number of cores, each run uses the serial kernels so runs
+#scale across processes. Returns the number of runs done now
+#Raises ValueError before running anything if a run fails the tests simulate() runs
+def run_sweep(spec, out, workers=None):
+	runs = sweep_runs(spec)
+	for p in runs:
+		try:
+			check_system(config_system(p))
+		except ValueError as err:
+			raise ValueError('run ' + json.dumps({k: p[k] for k in sorted(p)}) + ': ' + str(err))
+	done = set()
+	columns = None
+	if os.path.exists(out) and os.path.getsize(out) > 0:
+		with open(out, newline='') as inp:
+			reader = csv.DictReader(inp)
+			columns = reader.fieldnames
+			done = set(row['run_id'] for row in reader)
+	todo = [p for p in runs if run_id(p) not in done]
+	if not todo:
+		return 0
+	header = columns is None
+	if header:
+		settings = sorted(set(k for p in runs for k in p))
+		columns = ['run_id'] + settings + sweep_results
+	
+	masks = {}
+	for p in todo:
+		if p['shape']:
+			masks[(p['shape'], p['grid'])] = sweep_mask(p)
+	
+	with open(out, 'a', newline='') as dest:
+		writer = csv.DictWriter(dest, columns, extrasaction='ignore')
+		if header:
+			writer.writeheader()
+		if workers == 1:
+			results = map(sweep_one, todo)
+			pool = None
+		else:
+			pool = multiprocessing.Pool(workers, initializer=sweep_worker_init, initargs=(masks,))
+			results = pool.imap_unordered(sweep_one, todo)
+		try:
+			for row in results:
+				writer.writerow(row)
+				dest.flush()
+		finally:
+			if pool is not None:
+				pool.close()
+				pool.join()
+	return len(todo)
+
+
+#Command line for headless runs
+#  heat_project.py run config.json [--out DIR] [--plot]
+#  heat_project.py sweep spec.json summary.csv [--workers N]
+#  heat_project.py compile
+#config and spec files can also be TOML (.toml)
+def batch_main(argv):
+	parser = argparse.ArgumentParser(prog='heat_project.py', description='Headless 2D heat equation runs')
+	commands = parser.add_subparsers(dest='command', required=True)
+	run = commands.add_parser('run', help='run one simulation from a config file')
+	run.add_argument('config', help='JSON or TOML run config')
+	run.add_argument('--out', default=None, help='directory to save the frames to')
+	run.add_argument('--plot', action='store_true', help='show the animation at the end')
+	sweep = commands.add_parser('sweep', help='run a parameter sweep and write one summary row per run')
+	sweep.add_argument('spec', help='JSON or TOML sweep spec with base, runs and grid')
+	sweep.add_argument('out', help='CSV summary file, appended to and resumed from')
+	sweep.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+	commands.add_parser('compile', help='compile and cache the solver kernels ahead of the first run')
+	args = parser.parse_args(argv)
+	
+	if args.command == 'compile':
+		print('kernels compiled and cached in %.1f s' % precompile())
+	
+	elif args.command == 'run':
+		config = load_config(args.config)
+		if args.out:
+			config['out'] = args.out
+		if args.plot:
+			config['plot'] = True
+		try:
+			results = simulate(config)
+		except ValueError as err:
+			sys.exit('heat_project.py: ' + str(err))
+		print('%d frames, %d steps in %.2f s' % (len(results['frames']), results['steps'], results['wall_s']))
+		for name, value in zip(stat_names, results['stats'][-1]):
+			print('final %-8s %.6g' % (name, value))
+		if args.out:
+			print('frames saved to %s' % args.out)
+		if args.plot:
+			import matplotlib.pyplot as plt
+			plt.show()
+	
+	elif args.command == 'sweep':
+		spec = load_config(args.spec)
+		start = time.perf_counter()
+		try:
+			count = run_sweep(spec, args.out, args.workers)
+		except ValueError as err:
+			sys.exit('heat_project.py: ' + str(err))
+		print('%d runs in %.1f s, summary in %s' % (count, time.perf_counter() - start, args.out))
+
+#######################################################################################################
+#end of headless runs
+
 #########################################################################################
 #Curses Functions
 
@@ -230,8 +2309,8 @@ def inputbox_int(stdscr,val):
 	return var
 
 
-#Creates a input box for user to input positive float values
-def inputbox_float(stdscr,val):
+#Create a input box to enter positive int values excludes zero
+def inputbox_intreal(stdscr,val):
 	while True:
 		curses.curs_set(1)
 		inp = curses.newwin(3,50,5,10)
@@ -244,8 +2323,8 @@ def inputbox_float(stdscr,val):
 		var = inp.getstr(1,a).decode('utf-8')
 		curses.noecho()
 		try:
-			var = float(var)
-			if var <= 0 or var>= 2.5e-5:
+			var = int(var)
+			if var <= 0:
 				raise ValueError('Input out of bounds')
 			break
 		except ValueError:
@@ -258,10 +2337,9 @@ def inputbox_float(stdscr,val):
 			stdscr.getch()
 	return var
 
-
-
-#Create a input box to enter positive int values excludes zero
-def inputbox_intreal(stdscr,val):
+#creates a input box to enter positive integer values must be less than 10000
+#Use on grid input to prevent memory overflow
+def inputbox_intreal_bound(stdscr,val):
 	while True:
 		curses.curs_set(1)
 		inp = curses.newwin(3,50,5,10)
@@ -275,7 +2353,7 @@ def inputbox_intreal(stdscr,val):
 		curses.noecho()
 		try:
 			var = int(var)
-			if var <= 0:
+			if var <= 0 or var > 10000:
 				raise ValueError('Input out of bounds')
 			break
 		except ValueError:
@@ -288,9 +2366,8 @@ def inputbox_intreal(stdscr,val):
 			stdscr.getch()
 	return var
 
-#creates a input box to enter positive integer values must be less than 10000
-#Use on grid input to prevent memory overflow
-def inputbox_intreal_bound(stdscr,val):
+
+def inputbox_resolution(stdscr,val):
 	while True:
 		curses.curs_set(1)
 		inp = curses.newwin(3,50,5,10)
@@ -304,21 +2381,22 @@ def inputbox_intreal_bound(stdscr,val):
 		curses.noecho()
 		try:
 			var = int(var)
-			if var <= 0 or var > 10000:
+			if var <= 0 or var > 1000 or var%100:
 				raise ValueError('Input out of bounds')
 			break
 		except ValueError:
 			curses.curs_set(0)
 			inp.clear()
 			inp.box()
-			inp.addstr(1,1,'Incorrect Data type. Try again!')
+			inp.addstr(1,1,'Incorrect Data type or format. Try again!')
 			stdscr.refresh()
 			inp.refresh()
 			stdscr.getch()
 	return var
 
-
-def inputbox_resolution(stdscr,val):
+#Input box specific to simulation framerate
+#extra error handling for runtime%framerate
+def inputbox_rate(stdscr,val, runtime):
 	while True:
 		curses.curs_set(1)
 		inp = curses.newwin(3,50,5,10)
@@ -332,7 +2410,7 @@ def inputbox_resolution(stdscr,val):
 		curses.noecho()
 		try:
 			var = int(var)
-			if var <= 0 or var > 1000 or var%100:
+			if var <= 0 or var > 10000 or runtime%var:
 				raise ValueError('Input out of bounds')
 			break
 		except ValueError:
@@ -345,9 +2423,8 @@ def inputbox_resolution(stdscr,val):
 			stdscr.getch()
 	return var
 
-#Input box specific to simulation framerate
-#extra error handling for runtime%framerate
-def inputbox_rate(stdscr,val, runtime):
+#Creates a input box for user to input positive float values with no upper bound
+def inputbox_posfloat(stdscr,val):
 	while True:
 		curses.curs_set(1)
 		inp = curses.newwin(3,50,5,10)
@@ -360,15 +2437,15 @@ def inputbox_rate(stdscr,val, runtime):
 		var = inp.getstr(1,a).decode('utf-8')
 		curses.noecho()
 		try:
-			var = int(var)
-			if var <= 0 or var > 10000 or runtime%var:
+			var = float(var)
+			if var <= 0:
 				raise ValueError('Input out of bounds')
 			break
 		except ValueError:
 			curses.curs_set(0)
 			inp.clear()
 			inp.box()
-			inp.addstr(1,1,'Incorrect Data type or format. Try again!')
+			inp.addstr(1,1,'Incorrect Data type. Try again!')
 			stdscr.refresh()
 			inp.refresh()
 			stdscr.getch()
@@ -596,17 +2673,17 @@ def input_settings(stdscr):
 		
 		stdscr.clear()
 		stdscr.addstr(0,0,'Format: float')
-		stdscr.addstr(1,0,'Units: m^2/s    Recommended: <2.5e-5 m^2/s')
-		stdscr.addstr(2,0,'Warning: system stability check!')
-		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
-		bk_tp = inputbox_float(stdscr, 'background thermal diffusivity')
+		stdscr.addstr(1,0,'Units: m^2/s    Recommended: >0 m^2/s')
+		stdscr.addstr(2,0,'FTCS takes shorter time steps for faster materials')
+		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nCopper : 1.1e-4 m^2/s\nAluminium : 9.7e-5 m^2/s\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
+		bk_tp = inputbox_posfloat(stdscr, 'background thermal diffusivity')
 		
 		stdscr.clear()
 		stdscr.addstr(0,0,'Format: float')
-		stdscr.addstr(1,0,'Units: m^2/s    Recommended: <2.5e-5 m^2/s')
-		stdscr.addstr(2,0,'Warning: Must pass system stability check!')
-		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
-		ob_tp = inputbox_float(stdscr, 'object thermal diffusivity')
+		stdscr.addstr(1,0,'Units: m^2/s    Recommended: >0 m^2/s')
+		stdscr.addstr(2,0,'FTCS takes shorter time steps for faster materials')
+		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nCopper : 1.1e-4 m^2/s\nAluminium : 9.7e-5 m^2/s\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
+		ob_tp = inputbox_posfloat(stdscr, 'object thermal diffusivity')
 		
 		stdscr.clear()
 		stdscr.addstr(0,0,'Format: integer')
@@ -662,11 +2739,11 @@ def check_inputs(stdscr,pathtoshape, runtime, l, rate, top, right, bottom, left,
 	
 	s8='Background thermal diffusivity : ' + str(bk_tp)
 	stdscr.addstr(10,0,s8)
-	stdscr.addstr(10,50,'Recommended: <2.5e-5 m^2/s')
+	stdscr.addstr(10,50,'Recommended: >0 m^2/s')
 	
 	s9='Object thermal diffusivity : ' + str(ob_tp)
 	stdscr.addstr(11,0,s9)
-	stdscr.addstr(11,50,'Recommended: <2.5e-5 m^2/s')
+	stdscr.addstr(11,50,'Recommended: >0 m^2/s')
 	
 	s10='Background temp : ' + str(bk_temp)
 	stdscr.addstr(12,0,s10)
@@ -886,17 +2963,17 @@ def input_settings_step(stdscr):
 		
 		stdscr.clear()
 		stdscr.addstr(0,0,'Format: float')
-		stdscr.addstr(1,0,'Units: m^2/s    Recommended: <2.5e-5 m^2/s')
-		stdscr.addstr(2,0,'Warning: Must pass system stability check!')
-		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
-		bk_tp = inputbox_float(stdscr, 'background thermal diffusivity')
+		stdscr.addstr(1,0,'Units: m^2/s    Recommended: >0 m^2/s')
+		stdscr.addstr(2,0,'FTCS takes shorter time steps for faster materials')
+		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nCopper : 1.1e-4 m^2/s\nAluminium : 9.7e-5 m^2/s\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
+		bk_tp = inputbox_posfloat(stdscr, 'background thermal diffusivity')
 		
 		stdscr.clear()
 		stdscr.addstr(0,0,'Format: float')
-		stdscr.addstr(1,0,'Units: m^2/s    Recommended: <2.5e-5 m^2/s')
-		stdscr.addstr(2,0,'Warning: Must pass system stability check!')
-		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
-		ob_tp = inputbox_float(stdscr, 'object thermal diffusivity')
+		stdscr.addstr(1,0,'Units: m^2/s    Recommended: >0 m^2/s')
+		stdscr.addstr(2,0,'FTCS takes shorter time steps for faster materials')
+		stdscr.addstr(10,0,'Thermal diffusivity of Common Materials when T=~300K:\nCopper : 1.1e-4 m^2/s\nAluminium : 9.7e-5 m^2/s\nIron : 2.3e-5 m^2/s\nAir : 1.9e-5 m^2/s\nStainless Steel : 4.2e-6 m^2/s\nWater : 1.43e-7 m^2/s\nHuman : 1.23e-7 m^2/s\nWood : 8.2e-8 m^2/s')
+		ob_tp = inputbox_posfloat(stdscr, 'object thermal diffusivity')
 		
 		stdscr.clear()
 		stdscr.addstr(0,0,'Format: integer')
@@ -944,11 +3021,11 @@ def check_inputs_step(stdscr,pathtoshape, step_size, l, top, right, bottom, left
 	
 	s8='Background thermal diffusivity : ' + str(bk_tp)
 	stdscr.addstr(9,0,s8)
-	stdscr.addstr(9,50,'Recommended: <2.5e-5 m^2/s')
+	stdscr.addstr(9,50,'Recommended: >0 m^2/s')
 	
 	s9='Object thermal diffusivity : ' + str(ob_tp)
 	stdscr.addstr(10,0,s9)
-	stdscr.addstr(10,50,'Recommended: <2.5e-5 m^2/s')
+	stdscr.addstr(10,50,'Recommended: >0 m^2/s')
 	
 	s10='Background temp : ' + str(bk_temp)
 	stdscr.addstr(11,0,s10)
@@ -960,6 +3037,90 @@ def check_inputs_step(stdscr,pathtoshape, step_size, l, top, right, bottom, left
 
 
 
+#Menu to choose between the serial and parallel solver
+#returns number of threads to run the simulation on
+def input_solver(stdscr):
+	stdscr.clear()
+	max_threads = config.NUMBA_NUM_THREADS
+	stdscr.addstr(0,0,'Choose solver')
+	op = menubox(stdscr, ['Serial (1 core)', 'Parallel (all ' + str(max_threads) + ' cores)', 'Parallel (choose threads)'])
+	
+	if op == 1:
+		threads = 1
+	elif op == 2:
+		threads = max_threads
+	else:
+		stdscr.clear()
+		stdscr.addstr(0,0,'Format: positive integer')
+		stdscr.addstr(1,0,'Recommended: ' + str(max_threads) + ' (number of cores)')
+		stdscr.addstr(2,0,'Warning: more threads than cores will not run faster!')
+		threads = min(inputbox_intreal(stdscr, 'threads'), max_threads)
+	
+	return threads
+
+
+
+#Menu to choose the time integration scheme and the time step
+#sets scheme, dt, adaptive and amr of heat_sys, FTCS uses the largest stable dt
+#AMR uses the largest even block size up to 20 cells that divides the grid
+def input_scheme(stdscr, heat_sys):
+	stdscr.clear()
+	stdscr.addstr(0,0,'Choose time stepping')
+	op = menubox(stdscr, ['Explicit FTCS (largest stable dt)', 'Backward Euler (implicit, any dt)', 'Crank-Nicolson (implicit, any dt)', 'ADI (implicit, any dt, fastest)', 'ADI with adaptive dt', 'Explicit FTCS with adaptive mesh refinement'])
+	
+	heat_sys.amr = 0
+	if op == 1 or op == 6:
+		heat_sys.scheme = 'ftcs'
+		heat_sys.auto_dt()
+		if op == 6:
+			heat_sys.amr = next((b for b in range(20, 1, -2) if heat_sys.grid % b == 0), 0)
+		return
+	heat_sys.scheme = ['be', 'cn', 'adi', 'adi'][op - 2]
+	stdscr.clear()
+	stdscr.addstr(0,0,'Format: positive float')
+	if op == 5:
+		stdscr.addstr(1,0,'Units: seconds    Recommended: 1 s')
+		stdscr.addstr(2,0,'Starting time step, it grows as the temperatures settle')
+	else:
+		stdscr.addstr(1,0,'Units: seconds    Recommended: 10 s')
+		stdscr.addstr(2,0,'Frame rate (' + str(heat_sys.rate) + ' s) must be a whole number of time steps')
+	heat_sys.dt = inputbox_posfloat(stdscr, 'time step')
+	if op == 5:
+		stdscr.clear()
+		stdscr.addstr(0,0,'Format: positive float')
+		stdscr.addstr(1,0,'Units: Kelvin    Recommended: 1e-3 K')
+		stdscr.addstr(2,0,'Largest error allowed in a single time step')
+		heat_sys.adaptive = inputbox_posfloat(stdscr, 'step error')
+
+
+
+#Menu to choose whether the simulation stops once it reaches steady state
+#returns tolerance on the max temperature change per step, 0 runs the full runtime
+def input_tolerance(stdscr):
+	stdscr.clear()
+	stdscr.addstr(0,0,'Stop at steady state?')
+	op = menubox(stdscr, ['Run full runtime', 'Stop at steady state'])
+	
+	if op == 1:
+		tol = 0.0
+	else:
+		stdscr.clear()
+		stdscr.addstr(0,0,'Format: positive float')
+		stdscr.addstr(1,0,'Units: Kelvin per step    Recommended: 1e-4 K')
+		stdscr.addstr(2,0,'Simulation stops when no temperature changes more than this in a step')
+		tol = inputbox_posfloat(stdscr, 'tolerance')
+	
+	return tol
+
+
+#Line reporting where the simulation stopped, shown while plots are created
+def steady_report(heat_sys):
+	if heat_sys.steps_saved > 0:
+		return 'Steady state reached at ' + str((heat_sys.frames_run-1)*heat_sys.rate) + ' s in ' + str(heat_sys.steps_run) + ' steps, ' + str(heat_sys.steps_saved) + ' steps skipped'
+	return 'Ran full runtime of ' + str(heat_sys.runtime) + ' s in ' + str(heat_sys.steps_run) + ' steps'
+
+
+
 #####################################################################################
 #end of curses funcitons
 
@@ -968,6 +3129,7 @@ def check_inputs_step(stdscr,pathtoshape, step_size, l, top, right, bottom, left
 
 #Display of Simulation mode 1 
 def display1(stdscr):
+	import matplotlib.pyplot as plt
 	stdscr.clear()
 	stdscr.refresh()
 	curses.curs_set(0)
@@ -989,23 +3151,27 @@ def display1(stdscr):
 		stdscr.refresh()
 		
 		heat_sys = heat_system(runtime, rate, l, top, right, bottom, left, bk_tp, ob_tp, bk_temp, ob_temp)
-		
+		input_scheme(stdscr, heat_sys)
+		stdscr.clear()
 		
 		if input_tests(stdscr, heat_sys):
 			
 			heat_sys.get_shape(pathtoshape)
-			gtot = heat_sys.init_sys()
+			g = heat_sys.init_grid()
+			heat_sys.threads = input_solver(stdscr)
+			heat_sys.tol = input_tolerance(stdscr)
 			
 			stdscr.clear()
 			curses.curs_set(0)
 			stdscr.addstr(0,0,'Loading ...', curses.A_BOLD)
 			stdscr.refresh()
 		
-			gtot = heat_jump(gtot, heat_sys.dt, heat_sys.dx, heat_sys.bk_tp, heat_sys.runtime, heat_sys.rate, heat_sys.ob_tp , heat_sys.is_ob )
+			gtot = heat_sys.run_to_disk(g)
 			
 			stdscr.clear()
 			stdscr.addstr(0,0,'Creating plot and animation ...', curses.A_BOLD)
 			stdscr.addstr(1,0,'Please wait', curses.A_BOLD)
+			stdscr.addstr(2,0,steady_report(heat_sys))
 			stdscr.refresh()
 			doub_plot(gtot, heat_sys.x_size, heat_sys.grid)
 			
@@ -1025,7 +3191,7 @@ def display1(stdscr):
 			stdscr.addstr(0,0,'Plot must be closed to continue', curses.A_BOLD)
 			stdscr.addstr(1,0,'Press <enter> to continue')
 			stdscr.refresh()
-			ani = anim_plot(gtot, heat_sys.grid, heat_sys.is_ob, heat_sys.runtime)
+			ani = anim_plot(gtot, heat_sys.grid, heat_sys.is_ob, heat_sys.frames_run*heat_sys.rate, heat_sys.stats)
 			plt.show()
 			contin(stdscr)
 		else:
@@ -1050,6 +3216,7 @@ def display1(stdscr):
 
 #Display of Simulation mode 2
 def display2(stdscr):
+	import matplotlib.pyplot as plt
 	stdscr.clear()
 	stdscr.refresh()
 	curses.curs_set(0)
@@ -1071,12 +3238,15 @@ def display2(stdscr):
 		stdscr.refresh()
 		
 		heat_sys = heat_system(1, 1, l, top, right, bottom, left, bk_tp, ob_tp, bk_temp, ob_temp)
-		
+		#steps stay 1 s unless a fast material needs shorter ones to be stable, then
+		#each second of step_size takes frame_steps() of them
+		heat_sys.auto_dt()
 		
 		if input_tests(stdscr, heat_sys):
 			
 			heat_sys.get_shape(pathtoshape)
 			gtot = heat_sys.init_sys()
+			heat_sys.threads = input_solver(stdscr)
 			
 			
 			while True:
@@ -1086,8 +3256,8 @@ def display2(stdscr):
 				stdscr.addstr(0,0,'Loading ...', curses.A_BOLD)
 				stdscr.refresh()
 				
-				for i in range(step_size):
-					gtot[0] = heat_step(gtot[0], heat_sys.dt, heat_sys.dx, heat_sys.bk_tp, heat_sys.ob_tp , heat_sys.is_ob )
+				for i in range(step_size*heat_sys.frame_steps()):
+					gtot[0] = heat_sys.step(gtot[0])
 			
 				stdscr.clear()
 				stdscr.addstr(0,0,'Creating plot ...', curses.A_BOLD)
@@ -1131,6 +3301,7 @@ def display2(stdscr):
 
 #Display of Simulation mode 3
 def display3(stdscr):
+	import matplotlib.pyplot as plt
 	stdscr.clear()
 	stdscr.refresh()
 	curses.curs_set(0)
@@ -1154,27 +3325,36 @@ def display3(stdscr):
 		stdscr.refresh()
 		
 		heat_sys = heat_system(runtime, rate, l, top, right, bottom, left, bk_tp, ob_tp, bk_temp, ob_temp)
-		
+		input_scheme(stdscr, heat_sys)
+		stdscr.clear()
 		
 		if input_tests(stdscr, heat_sys):
+			scheme, dt, adaptive, amr = heat_sys.scheme, heat_sys.dt, heat_sys.adaptive, heat_sys.amr
 			heat_sys = heat_system(runtime, rate, l, top, right, bottom, left, bk_tp, ob_tp, bk_temp, ob_temp)
+			heat_sys.scheme, heat_sys.dt, heat_sys.adaptive, heat_sys.amr = scheme, dt, adaptive, amr
 			heat_sys.get_shape(pathtoshape)
-			gtot = heat_sys.init_sys()
+			g = heat_sys.init_grid()
+			heat_sys.threads = input_solver(stdscr)
+			heat_sys.tol = input_tolerance(stdscr)
 			stdscr.clear()
 			curses.curs_set(0)
 			stdscr.addstr(0,0,'How would you like the internal temperature to be set?')
 			
 			b = menubox(stdscr,['Random','Abs(Random)','Centered Dot'])
 			if b == 1:
-				gtot[0, 1:-1, 1:-1] = gtot[0,1:-1,1:-1] + np.random.uniform(-1,1,size = (l-2,l-2))*heat_sys.ob_temp
+				g[1:-1, 1:-1] = g[1:-1,1:-1] + np.random.uniform(-1,1,size = (l-2,l-2))*heat_sys.ob_temp
 				pass
 			elif b == 2:
-				gtot[0, 1:-1, 1:-1] = gtot[0,1:-1,1:-1] + np.random.uniform(0,1,size = (l-2,l-2))*heat_sys.ob_temp
+				g[1:-1, 1:-1] = g[1:-1,1:-1] + np.random.uniform(0,1,size = (l-2,l-2))*heat_sys.ob_temp
 				pass
 			elif b == 3:
 				mi = heat_sys.grid//2 - heat_sys.grid//20
 				ma = heat_sys.grid//2 + heat_sys.grid//20
-				gtot[0,mi:ma,mi:ma] = heat_sys.ob_temp
+				g[mi:ma,mi:ma] = heat_sys.ob_temp
+				#most of the grid stays at the background temperature, skip it until heat arrives
+				#(AMR already solves it on the coarse grid)
+				if heat_sys.amr == 0:
+					heat_sys.active = 32
 				pass
 			
 			stdscr.clear()
@@ -1182,11 +3362,12 @@ def display3(stdscr):
 			stdscr.addstr(0,0,'Loading ...', curses.A_BOLD)
 			stdscr.refresh()
 			
-			gtot = heat_jump(gtot, heat_sys.dt, heat_sys.dx, heat_sys.bk_tp, heat_sys.runtime, heat_sys.rate, heat_sys.ob_tp, heat_sys.is_ob)
+			gtot = heat_sys.run_to_disk(g)
 			
 			stdscr.clear()
 			stdscr.addstr(0,0,'Creating plot and animation ...', curses.A_BOLD)
 			stdscr.addstr(1,0,'Please wait', curses.A_BOLD)
+			stdscr.addstr(2,0,steady_report(heat_sys))
 			stdscr.refresh()
 			doub_plot(gtot, heat_sys.x_size, heat_sys.grid)
 			
@@ -1206,7 +3387,7 @@ def display3(stdscr):
 			stdscr.addstr(0,0,'Plot must be closed to continue', curses.A_BOLD)
 			stdscr.addstr(1,0,'Press <enter> to continue')
 			stdscr.refresh()
-			ani = anim_plot(gtot, heat_sys.grid, heat_sys.is_ob, heat_sys.runtime)
+			ani = anim_plot(gtot, heat_sys.grid, heat_sys.is_ob, heat_sys.frames_run*heat_sys.rate, heat_sys.stats)
 			plt.show()
 			
 			contin(stdscr)
@@ -1227,6 +3408,74 @@ def display3(stdscr):
 	
     
 
+#Display of Steady State mode
+#Solves for the final temperature directly instead of running the simulation
+def display4(stdscr):
+	import matplotlib.pyplot as plt
+	stdscr.clear()
+	stdscr.refresh()
+	curses.curs_set(0)
+	curses.start_color()
+
+	stdscr.addstr(0,0,'Welcome to Steady State Mode\nThe final temperature of the system is solved for directly\nRuntime and framerate are not used in this mode\nPlease choose the settings for your simulation ...\n',curses.A_BOLD)
+
+	contin(stdscr)
+	
+	pathtoshape, runtime, l, rate, top, right, bottom, left, bk_tp, ob_tp, bk_temp, ob_temp = input_settings(stdscr)
+		
+	stdscr.clear()
+	stdscr.addstr(0,0,'Steady State Mode\n',curses.A_BOLD)
+	
+	check_inputs(stdscr,pathtoshape, runtime, l, rate, top, right, bottom, left, bk_tp, ob_tp, bk_temp, ob_temp)
+	
+	if yesnobox(stdscr):
+		stdscr.clear()
+		stdscr.refresh()
+		
+		heat_sys = heat_system(runtime, rate, l, top, right, bottom, left, bk_tp, ob_tp, bk_temp, ob_temp)
+		#the steady state has no time steps, a stable dt only lets it pass the tests
+		heat_sys.auto_dt()
+		
+		if input_tests(stdscr, heat_sys):
+			heat_sys.get_shape(pathtoshape)
+			
+			stdscr.clear()
+			curses.curs_set(0)
+			stdscr.addstr(0,0,'Solving ...', curses.A_BOLD)
+			stdscr.refresh()
+			
+			g = heat_sys.steady_state()
+			
+			stdscr.clear()
+			stdscr.addstr(0,0,'Creating plot ...', curses.A_BOLD)
+			stdscr.addstr(1,0,'Please wait', curses.A_BOLD)
+			stdscr.refresh()
+			doub_plot(g[None], heat_sys.x_size, heat_sys.grid)
+			
+			stdscr.clear()
+			stdscr.addstr(0,0,'Plot must be closed to continue', curses.A_BOLD)
+			stdscr.addstr(1,0,'Press <enter> to continue')
+			stdscr.refresh()
+			
+			plt.show()
+			contin(stdscr)
+		else:
+			stdscr.clear()
+			stdscr.addstr('Press enter to reset...')
+			stdscr.refresh()
+			stdscr.getch()
+			display4(stdscr)
+	else:
+		stdscr.clear()
+		stdscr.addstr('Press enter to reset...')
+		stdscr.refresh()
+		stdscr.getch()
+		display4(stdscr)
+	
+	stdscr.clear()
+
+
+
 def help_display(stdscr):
 	stdscr.clear()
 	stdscr.refresh()
@@ -1261,7 +3510,7 @@ def help_display(stdscr):
 		stdscr.clear()
 		stdscr.addstr(0,0,'Why do my settings keep failing input tests?', curses.A_BOLD)
 		stdscr.addstr(1,0,'Press <enter> to reset')
-		stdscr.addstr(2,0,'Some settings need to be in a certain format or factors of each other for some modes to function properly. Try reading the recommended values or using the Simple/Default simulation mode.\nSome of the most commmon settings that need specific formatting are the Runtime and Framerate, the framerate must be a factor of the runtime and the runtime cannot be too large, the Resolution, which must be a factor of 100, and the thermal diffusivity, which must be less than 2.5e-5 m^2/s and pass the system stability tests')
+		stdscr.addstr(2,0,'Some settings need to be in a certain format or factors of each other for some modes to function properly. Try reading the recommended values or using the Simple/Default simulation mode.\nSome of the most commmon settings that need specific formatting are the Runtime and Framerate, the framerate must be a factor of the runtime and the runtime cannot be too large, the Resolution, which must be a factor of 100, and the thermal diffusivity, which must be positive. FTCS picks a time step small enough to be stable for it, so fast materials like copper only take more steps')
 		stdscr.refresh()
 		stdscr.getch()
 
@@ -1296,7 +3545,7 @@ def help_display(stdscr):
 		stdscr.clear()
 		stdscr.addstr(0,0,'How to use Custom shape?', curses.A_BOLD)
 		stdscr.addstr(1,0,'Press <enter> to reset')
-		stdscr.addstr(2,0,'To enter a custom shape you can overwrite the file project_custom.png with a new .png image.\nThe custom .png image must be 100x100 pixels.\nAny pixels with an average RGB brightness below 100 will be defined as the objects pixels.\nBlack and white pictures work best, but the main requirement is that the image be 100x100 pixels.\nHave Fun!')
+		stdscr.addstr(2,0,'To enter a custom shape you can overwrite the file project_custom.png with a new .png image.\nThe image can be any size, it is scaled to the grid with each cell taking the pixel nearest its center, and non square images are stretched to a square.\nAny pixels with an average RGB brightness below 100 will be defined as the objects pixels.\nBlack and white pictures work best, and square images whose size divides the resolution (e.g. 100x100 pixels) are scaled without any distortion.\nHave Fun!')
 		stdscr.refresh()
 		stdscr.getch()
 		
@@ -1318,7 +3567,7 @@ def main(stdscr):
 	welcome= "Welcome to the 2D Heat Equation Simulator! v1.3"
 	stdscr.addstr(0,0,welcome,curses.A_BOLD)
 
-	start_menu=["Simulation Mode","Step Mode","Sandbox Mode", "Help", "Exit"]
+	start_menu=["Simulation Mode","Step Mode","Sandbox Mode", "Steady State Mode", "Help", "Exit"]
 
 	a = menubox(stdscr, start_menu)
     
@@ -1343,14 +3592,21 @@ def main(stdscr):
 		else:
 			stdscr.clear()
 			stdscr.refresh()
-	elif a==4:#HELP SCREEN
+	elif a==4:#DISPLAY4
+		display4(stdscr)
+		if ret_main(stdscr):
+			main(stdscr)
+		else:
+			stdscr.clear()
+			stdscr.refresh()
+	elif a==5:#HELP SCREEN
 		 help_display(stdscr)
 		 if ret_main(stdscr):
 			 main(stdscr)
 		 else:
 			 stdscr.clear()
 			 stdscr.refresh()
-	elif a==5:#QUIT
+	elif a==6:#QUIT
 		 pass
 
 	stdscr.clear()
@@ -1365,6 +3621,10 @@ def main(stdscr):
 
 
 
-curses.wrapper(main)
+if __name__ == '__main__':
+	if len(sys.argv) > 1:
+		batch_main(sys.argv[1:])
+	else:
+		curses.wrapper(main)
 
 